@@ -1,4 +1,6 @@
-import argparse, os
+import argparse, os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.profiling import run_main
 
 def main():
     ap=argparse.ArgumentParser()
@@ -17,4 +19,4 @@ def main():
     print("strategist: outputs generated")
 
 if __name__=="__main__":
-    main()
+    run_main(main, "strategist")
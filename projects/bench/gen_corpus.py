@@ -0,0 +1,111 @@
+"""
+Synthetic corpus for the pipeline benchmarks (bench/run_bench.py).
+
+Writes, under --out, deterministic data shaped like the real inputs:
+
+    raw/NNNNNNN_<slug>.raw.md   raw scans (title line + claim line), as scanner_stub collects
+    bullets.ndjson              scanner bullets for ingest_scanner_bullets.py (~10% duplicate KB keys)
+    knowledge_base.csv          knowledge base with --rows rows
+    signals.jsonl               --rows signals valid against 02_structured/structurer_schema.json
+
+Every file is streamed out row by row, so 10M-row corpora need no more
+memory than 1k-row ones.
+
+    python bench/gen_corpus.py --rows 100000 --out /tmp/corpus
+"""
+import argparse
+import csv
+import json
+import os
+import random
+
+KB_FIELDS = ["date", "company", "product", "customer", "region", "threat_opportunity", "source", "confidence"]
+CRITERIA = ["throughput", "reliability", "install_time", "service_coverage", "integration_effort",
+            "TCO_band", "references", "lead_time", "SLA_terms"]
+REGIONS = ["North America", "Europe", "Asia-Pacific", "LATAM", "MEA"]
+EVENTS = ["press_note", "job_post", "case_study", "earnings_call"]
+WORDS = ("modular conveyor sortation parcel injection shuttle retrofit brownfield greenfield integration "
+         "throughput uptime deployment pilot contract expansion warehouse robotics picking").split()
+
+
+def default_docs(rows):
+    """Raw scans to generate for a corpus of `rows` rows (one per row, capped at 10k files)."""
+    return min(rows, 10000)
+
+
+def entity_count(rows):
+    return min(1000, max(3, rows // 100))
+
+
+def sentence(rng, n=8):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def kb_row(rng, i, companies):
+    return {
+        "date": f"20{20 + i % 6:02d}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        "company": companies[i % len(companies)],
+        "product": f"Product-{i}",
+        "customer": f"Customer {rng.randrange(10000)}",
+        "region": rng.choice(REGIONS),
+        "threat_opportunity": sentence(rng),
+        "source": f"https://example.com/item/{i}",
+        "confidence": rng.choice("HML"),
+    }
+
+
+def generate(out, rows, docs=None, seed=42):
+    """Write the corpus; returns {name: count} for what was written."""
+    rng = random.Random(seed)
+    docs = default_docs(rows) if docs is None else docs
+    ents = [f"Vendor{j:04d}" for j in range(entity_count(rows))]
+    os.makedirs(os.path.join(out, "raw"), exist_ok=True)
+
+    for i in range(docs):
+        ent = ents[i % len(ents)]
+        with open(os.path.join(out, "raw", f"{i:07d}_{rng.choice(EVENTS)}_{ent.lower()}.raw.md"), "w", encoding="utf-8") as f:
+            f.write(f"{ent} {sentence(rng, 5)}\n{sentence(rng)} Source: synthetic.\n")
+
+    with open(os.path.join(out, "knowledge_base.csv"), "w", encoding="utf-8", newline="") as f:
+        w = csv.DictWriter(f, fieldnames=KB_FIELDS)
+        w.writeheader()
+        for i in range(rows):
+            w.writerow(kb_row(rng, i, ents))
+
+    bullets = max(1, rows // 10)
+    with open(os.path.join(out, "bullets.ndjson"), "w", encoding="utf-8", buffering=1 << 20) as f:
+        for i in range(bullets):
+            # every tenth bullet repeats an existing KB key to exercise de-duplication
+            f.write(json.dumps(kb_row(rng, i * 10 if i % 10 == 0 else rows + i, ents)) + "\n")
+
+    with open(os.path.join(out, "signals.jsonl"), "w", encoding="utf-8", buffering=1 << 20) as f:
+        for i in range(rows):
+            f.write(json.dumps({
+                "entity": ents[i % len(ents)],
+                "product": f"Product-{i}",
+                "event_type": rng.choice(EVENTS),
+                "event_date": "UNKNOWN",
+                "claim": sentence(rng),
+                "evidence_path": f"01_raw_scans/{i:07d}.raw.md",
+                "evidence_locator": "L1-L2",
+                "confidence": rng.choice(["low", "medium", "high"]),
+                "market_segment": "UNKNOWN",
+                "geography": rng.choice(REGIONS),
+                "impact_area": rng.choice(CRITERIA + ["UNKNOWN"]),
+            }) + "\n")
+    return {"raw": docs, "knowledge_base": rows, "bullets": bullets, "signals": rows}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--rows", type=int, default=1000, help="KB rows and signals to generate")
+    ap.add_argument("--docs", type=int, default=None, help="raw scans to generate (default: rows, capped at 10000)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", required=True)
+    args = ap.parse_args()
+    counts = generate(args.out, args.rows, args.docs, args.seed)
+    print("gen_corpus: " + ", ".join(f"{k}={v}" for k, v in counts.items()) + f" in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Pipeline benchmarks: time each stage and the full JOBS cycle on synthetic corpora.
+
+For every --sizes value a corpus is generated (bench/gen_corpus.py) in a
+scratch work directory that links agents/ and tools/ from this tree, then
+each stage runs as its own process:
+
+    ingest       ingest_scanner_bullets.py --stream over bullets.ndjson into a KB of <rows> rows
+    validate     tools/validate_jsonl.py over <rows> signals
+    analyst      agents/analyst.py over <rows> signals
+    comparator   agents/comparator.py over <rows> signals
+    auditor      agents/auditor.py --full over the analyst/comparator outputs
+    structurer   agents/structurer.py --full over the raw scans
+    cycle        tools/job_orchestrator.py --force on a copy of --jobs, fed the raw scans
+
+Wall time, CPU user/sys and peak RSS come from os.wait4() on the stage
+process. One JSON record per stage and size is appended to --results.
+With a --baseline file (written by --save_baseline), stages slower or
+larger than baseline by more than --tolerance are flagged and the exit
+code is 1.
+
+    python bench/run_bench.py --sizes 1000,100000
+    python bench/run_bench.py --sizes 1000 --save_baseline
+"""
+import argparse
+import datetime
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gen_corpus import generate  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STAGES = ["ingest", "validate", "analyst", "comparator", "auditor", "structurer", "cycle"]
+# regressions smaller than this many seconds are treated as timer noise
+MIN_WALL_DELTA = 0.1
+
+
+def link_tree(work):
+    """Make work look like the project root: code linked, schema/criteria copied, outputs empty."""
+    os.makedirs(work, exist_ok=True)
+    for name in ("agents", "tools", "00_instructions", "ingest_scanner_bullets.py"):
+        if os.path.exists(os.path.join(ROOT, name)) and not os.path.lexists(os.path.join(work, name)):
+            os.symlink(os.path.join(ROOT, name), os.path.join(work, name))
+    for rel in ("02_structured/structurer_schema.json", "04_comparisons/comparison_criteria.json"):
+        os.makedirs(os.path.join(work, os.path.dirname(rel)), exist_ok=True)
+        shutil.copy(os.path.join(ROOT, rel), os.path.join(work, rel))
+
+
+def measure(cmd, cwd, log):
+    """Run cmd to completion; returns (exit code, wall s, user s, sys s, peak RSS in KiB or None)."""
+    t0 = time.perf_counter()
+    p = subprocess.Popen(cmd, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+    if not hasattr(os, "wait4"):  # Windows: no rusage
+        rc = p.wait()
+        return rc, time.perf_counter() - t0, None, None, None
+    _, status, ru = os.wait4(p.pid, 0)
+    wall = time.perf_counter() - t0
+    p.returncode = os.waitstatus_to_exitcode(status)
+    rss = ru.ru_maxrss // 1024 if sys.platform == "darwin" else ru.ru_maxrss
+    return p.returncode, wall, ru.ru_utime, ru.ru_stime, rss
+
+
+def stage_plan(work, corpus, counts, jobs):
+    """(stage, work dir, setup callable, command, units processed) in run order."""
+    py = sys.executable
+
+    def copy(src, dst):
+        def setup():
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy(src, dst)
+        return setup
+
+    def raw_scans():
+        shutil.rmtree(os.path.join(work, "01_raw_scans"), ignore_errors=True)
+        shutil.copytree(os.path.join(corpus, "raw"), os.path.join(work, "01_raw_scans"))
+
+    cycle = os.path.join(os.path.dirname(work), "cycle")
+
+    def cycle_setup():
+        shutil.rmtree(cycle, ignore_errors=True)
+        link_tree(cycle)
+        os.makedirs(os.path.join(cycle, "JOBS"))
+        shutil.copy(jobs, os.path.join(cycle, "JOBS"))
+        os.makedirs(os.path.join(cycle, "tests", "fixtures"))
+        os.symlink(os.path.join(corpus, "raw"), os.path.join(cycle, "tests", "fixtures", "01_raw_scans_sample"))
+
+    kb = os.path.join("02_structured", "knowledge_base.csv")
+    signals = os.path.join("02_structured", "signals.jsonl")
+    return [
+        ("ingest", work, copy(os.path.join(corpus, "knowledge_base.csv"), os.path.join(work, kb)),
+         [py, "ingest_scanner_bullets.py", "--stream", os.path.join(corpus, "bullets.ndjson"), "--kb", kb], counts["bullets"]),
+        ("validate", work, copy(os.path.join(corpus, "signals.jsonl"), os.path.join(work, signals)),
+         [py, "tools/validate_jsonl.py", "--schema", "02_structured/structurer_schema.json", "--input", signals], counts["signals"]),
+        ("analyst", work, None, [py, "agents/analyst.py"], counts["signals"]),
+        ("comparator", work, None, [py, "agents/comparator.py"], counts["signals"]),
+        ("auditor", work, None, [py, "agents/auditor.py", "--full"], counts["signals"]),
+        ("structurer", work, raw_scans, [py, "agents/structurer.py", "--full"], counts["raw"]),
+        ("cycle", cycle, cycle_setup, [py, "tools/job_orchestrator.py", "--jobs", "JOBS/" + os.path.basename(jobs), "--force"], counts["raw"]),
+    ]
+
+
+def load_baseline(path):
+    """(stage, rows) -> latest record in a results/baseline JSONL."""
+    base = {}
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    r = json.loads(line)
+                    base[(r["stage"], r["rows"])] = r
+    return base
+
+
+def regressions(rec, base, tolerance):
+    """Reasons rec is worse than its baseline record, if any."""
+    out = []
+    if base is None or rec["rc"] != 0:
+        return out
+    if rec["wall_s"] > base["wall_s"] * (1 + tolerance) and rec["wall_s"] - base["wall_s"] > MIN_WALL_DELTA:
+        out.append(f"wall {base['wall_s']:.2f}s -> {rec['wall_s']:.2f}s")
+    if rec.get("max_rss_kb") and base.get("max_rss_kb") and rec["max_rss_kb"] > base["max_rss_kb"] * (1 + tolerance):
+        out.append(f"rss {base['max_rss_kb'] // 1024}MB -> {rec['max_rss_kb'] // 1024}MB")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic corpora.")
+    ap.add_argument("--sizes", default="1000", help="comma-separated corpus sizes in rows (e.g. 1000,100000,10000000)")
+    ap.add_argument("--stages", default=",".join(STAGES), help="comma-separated subset of: " + ",".join(STAGES))
+    ap.add_argument("--jobs", default=os.path.join(ROOT, "JOBS", "2025W45.jobs.json"), help="jobs file for the cycle stage")
+    ap.add_argument("--results", default=os.path.join(ROOT, "bench", "results.jsonl"))
+    ap.add_argument("--baseline", default=os.path.join(ROOT, "bench", "baseline.jsonl"))
+    ap.add_argument("--save_baseline", action="store_true", help="replace the baseline with this run's records")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown / RSS growth vs baseline (0.25 = 25%%)")
+    ap.add_argument("--label", default="", help="free-form tag stored with each record (e.g. a git revision)")
+    ap.add_argument("--workdir", default=None, help="scratch directory (default: a temp dir, removed afterwards)")
+    args = ap.parse_args()
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        ap.error(f"unknown stages: {','.join(sorted(unknown))}")
+
+    scratch = args.workdir or tempfile.mkdtemp(prefix="cgce_bench_")
+    base = load_baseline(args.baseline)
+    records, flagged = [], []
+    try:
+        for rows in (int(s) for s in args.sizes.split(",")):
+            root = os.path.join(scratch, str(rows))
+            shutil.rmtree(root, ignore_errors=True)
+            corpus, work = os.path.join(root, "corpus"), os.path.join(root, "work")
+            counts = generate(corpus, rows)
+            link_tree(work)
+            with open(os.path.join(root, "bench.log"), "w", encoding="utf-8") as log:
+                for stage, cwd, setup, cmd, units in stage_plan(work, corpus, counts, os.path.abspath(args.jobs)):
+                    if stage not in stages:
+                        continue
+                    if setup:
+                        setup()
+                    log.write(f"== {stage} ({rows} rows)\n")
+                    log.flush()
+                    rc, wall, user, sys_, rss = measure(cmd, cwd, log)
+                    rec = {"timestamp": datetime.datetime.utcnow().replace(microsecond=0).isoformat() + "Z",
+                           "label": args.label, "stage": stage, "rows": rows, "units": units,
+                           "wall_s": round(wall, 4), "units_per_s": round(units / wall, 1) if wall else None,
+                           "user_s": user and round(user, 4), "sys_s": sys_ and round(sys_, 4), "max_rss_kb": rss, "rc": rc}
+                    records.append(rec)
+                    why = regressions(rec, base.get((stage, rows)), args.tolerance)
+                    if rc != 0:
+                        why.append(f"exit {rc} (see {os.path.join(root, 'bench.log')})")
+                    if why:
+                        flagged.append((rec, why))
+                    rss_mb = f"{rss / 1024:.0f}" if rss is not None else "-"
+                    print(f"{stage:<11} {rows:>10} {wall:>9.3f}s {rec['units_per_s'] or 0:>12,.0f}/s {rss_mb:>7} MB"
+                          + ("  REGRESSION: " + "; ".join(why) if why else ""), flush=True)
+    finally:
+        if not args.workdir and not flagged:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write("".join(json.dumps(r) + "\n" for r in records))
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+        print(f"run_bench: baseline saved to {args.baseline}")
+    if flagged:
+        print(f"run_bench: {len(flagged)} stage(s) flagged; work files kept in {scratch}")
+        sys.exit(1)
+    print(f"run_bench: {len(records)} results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
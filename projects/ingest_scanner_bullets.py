@@ -6,14 +6,29 @@ Ingests Scanner bullet output and appends normalized rows to knowledge_base.csv,
 de-duplicating by (date, company, product).
 
 Input: JSON file or stdin containing list of scanner bullets
+       (with --stream: NDJSON, concatenated JSON objects or a JSON array,
+       parsed incrementally so memory stays bounded)
 Output: Appends to /02_structured/knowledge_base.csv
+
+The de-duplication keys are kept in a SQLite sidecar next to the CSV
+(knowledge_base.csv.keys.sqlite) so an ingest only touches the rows it adds.
+The sidecar records the CSV's size and mtime and is rebuilt from the CSV
+whenever they no longer match (e.g. after a manual edit).
+
+Storage goes through tools/kb_store.py: if 02_structured/knowledge_base.kb
+(the columnar store) exists it is used instead of the CSV; --kb selects a
+knowledge base explicitly.
 """
 
-import csv
+import argparse
 import json
+import sqlite3
 import sys
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
+from typing import Any, Dict, Iterable, Iterator, Optional, Set, TextIO, Tuple, Union
+
+from tools.kb_store import ColumnarKB, CsvKB, open_kb, resolve_kb_path
+from tools.profiling import run_main
 
 
 # Field names for the knowledge base CSV
@@ -31,6 +46,38 @@ FIELDNAMES = [
 # Path to knowledge base CSV
 KB_PATH = Path('02_structured/knowledge_base.csv')
 
+# Suffix of the persistent de-duplication key index stored next to the KB
+KEY_INDEX_SUFFIX = '.keys.sqlite'
+
+# Rows buffered before each write+flush to the knowledge base
+DEFAULT_BATCH_SIZE = 1000
+
+# Characters read per refill by the streaming JSON parser
+STREAM_CHUNK_SIZE = 1 << 16
+
+# Largest single record (characters) the streaming parser buffers before giving up
+STREAM_MAX_RECORD = 1 << 24
+
+# Characters that can begin a JSON value
+JSON_VALUE_START = frozenset('{["-0123456789tfnNI')
+
+
+def iter_existing_keys(kb_path: Path) -> Iterator[Tuple[str, str, str]]:
+    """
+    Stream (date, company, product) tuples from knowledge base.
+
+    Args:
+        kb_path: Path to knowledge_base.csv (or a columnar .kb store)
+
+    Yields:
+        (date, company, product) tuples, one per knowledge-base row
+    """
+    try:
+        for row in open_kb(kb_path).scan(columns=['date', 'company', 'product']):
+            yield (row['date'].strip(), row['company'].strip(), row['product'].strip())
+    except Exception as e:
+        print(f"Warning: Error reading existing knowledge base: {e}", file=sys.stderr)
+
 
 def load_existing_keys(kb_path: Path) -> Set[Tuple[str, str, str]]:
     """
@@ -42,25 +89,105 @@ def load_existing_keys(kb_path: Path) -> Set[Tuple[str, str, str]]:
     Returns:
         Set of (date, company, product) tuples
     """
-    existing_keys = set()
+    return set(iter_existing_keys(kb_path))
 
-    if not kb_path.exists():
-        return existing_keys
 
-    try:
-        with open(kb_path, 'r', encoding='utf-8', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                key = (
-                    row.get('date', '').strip(),
-                    row.get('company', '').strip(),
-                    row.get('product', '').strip()
-                )
-                existing_keys.add(key)
-    except Exception as e:
-        print(f"Warning: Error reading existing knowledge base: {e}", file=sys.stderr)
+def kb_fingerprint(kb_path: Path) -> Optional[Tuple[int, int]]:
+    """
+    Return the fingerprint used to detect out-of-band KB edits.
+
+    Args:
+        kb_path: Path to knowledge_base.csv (or a columnar .kb store)
 
-    return existing_keys
+    Returns:
+        (size, mtime_ns) for a CSV, (rows, manifest mtime_ns) for a columnar
+        store, or None if the KB does not exist
+    """
+    return open_kb(kb_path).fingerprint()
+
+
+class KeyIndex:
+    """
+    Persistent (date, company, product) key set stored beside the knowledge base.
+
+    Lookups and inserts hit the SQLite sidecar instead of re-reading the CSV.
+    New keys are staged in an open transaction and only committed by sync(),
+    together with the CSV fingerprint, after the rows were written; an
+    interrupted ingest therefore leaves a stale index that is rebuilt on the
+    next open instead of one that claims rows the CSV does not have.
+    """
+
+    def __init__(self, kb_path: Path):
+        """
+        Open (or create) the index for kb_path, rebuilding it if stale.
+
+        Args:
+            kb_path: Path to knowledge_base.csv
+        """
+        self.kb_path = kb_path
+        self.path = kb_path.with_name(kb_path.name + KEY_INDEX_SUFFIX)
+        try:
+            self._open()
+        except sqlite3.DatabaseError as e:
+            print(f"Warning: Discarding unreadable key index {self.path}: {e}", file=sys.stderr)
+            self.path.unlink(missing_ok=True)
+            self._open()
+
+    def _open(self) -> None:
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS keys ('
+            ' date TEXT NOT NULL, company TEXT NOT NULL, product TEXT NOT NULL,'
+            ' PRIMARY KEY (date, company, product)) WITHOUT ROWID;'
+            'CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER);'
+        )
+        if self._stored_fingerprint() != kb_fingerprint(self.kb_path):
+            self.rebuild()
+
+    def _stored_fingerprint(self) -> Optional[Tuple[int, int]]:
+        meta = dict(self.conn.execute('SELECT name, value FROM meta'))
+        if 'size' not in meta or 'mtime_ns' not in meta:
+            return None
+        return meta['size'], meta['mtime_ns']
+
+    def rebuild(self) -> None:
+        """Repopulate the index from a full scan of the knowledge base."""
+        with self.conn:
+            self.conn.execute('DELETE FROM keys')
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO keys VALUES (?, ?, ?)',
+                iter_existing_keys(self.kb_path)
+            )
+            self._write_fingerprint()
+
+    def _write_fingerprint(self) -> None:
+        fp = kb_fingerprint(self.kb_path)
+        if fp is None:
+            self.conn.execute('DELETE FROM meta')
+            return
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO meta VALUES (?, ?)',
+            [('size', fp[0]), ('mtime_ns', fp[1])]
+        )
+
+    def __contains__(self, key: Tuple[str, str, str]) -> bool:
+        cur = self.conn.execute(
+            'SELECT 1 FROM keys WHERE date = ? AND company = ? AND product = ?', key
+        )
+        return cur.fetchone() is not None
+
+    def add(self, key: Tuple[str, str, str]) -> None:
+        """Stage a key; it becomes durable on the next sync()."""
+        self.conn.execute('INSERT OR IGNORE INTO keys VALUES (?, ?, ?)', key)
+
+    def sync(self) -> None:
+        """Commit staged keys and record the knowledge base's current fingerprint."""
+        with self.conn:
+            self._write_fingerprint()
+
+    def close(self) -> None:
+        """Close the index, discarding any keys not committed by sync()."""
+        self.conn.close()
 
 
 def normalize_bullet(bullet: Dict) -> Dict:
@@ -111,81 +238,231 @@ def validate_bullet(bullet: Dict) -> Tuple[bool, str]:
     return True, ""
 
 
-def ensure_kb_exists(kb_path: Path) -> None:
+def iter_stream_bullets(f: TextIO, chunk_size: int = STREAM_CHUNK_SIZE,
+                        max_record: int = STREAM_MAX_RECORD) -> Iterator[Any]:
     """
-    Ensure knowledge base CSV exists with headers.
+    Incrementally parse scanner bullets from a text stream.
+
+    Accepts newline-delimited JSON, whitespace-separated JSON objects, or a
+    single top-level JSON array whose elements are yielded one at a time.
+    Only the unconsumed tail of the input is held in memory, and a record
+    that still does not parse once max_record characters are buffered is
+    reported as invalid rather than read to the end of the input.
 
     Args:
-        kb_path: Path to knowledge_base.csv
+        f: Text stream to read from
+        chunk_size: Number of characters to read per refill
+        max_record: Largest single record, in characters, to buffer
+
+    Yields:
+        Decoded JSON values (normally bullet dictionaries)
+
+    Raises:
+        json.JSONDecodeError: If the stream contains invalid JSON
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    eof = False
+    in_array = None
+    # Inside the array: 'first' after '[', 'value' after ',', 'sep' after an element
+    expect = None
+
+    while True:
+        # Skip whitespace, refilling as needed
+        while True:
+            while pos < len(buf) and buf[pos].isspace():
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+
+        if pos >= len(buf):
+            if in_array:
+                raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+            return
+
+        if in_array is None:
+            in_array = buf[pos] == '['
+            if in_array:
+                pos += 1
+                expect = 'first'
+                continue
+        elif in_array and buf[pos] == ']' and expect != 'value':
+            pos += 1
+            trailing = buf[pos:].strip() or f.read(chunk_size).strip()
+            if trailing:
+                raise json.JSONDecodeError("Extra data after JSON array", trailing, 0)
+            return
+        elif in_array and expect == 'sep':
+            if buf[pos] != ',':
+                raise json.JSONDecodeError("Expecting ',' delimiter", buf, pos)
+            pos += 1
+            expect = 'value'
+            continue
+
+        if buf[pos] not in JSON_VALUE_START:
+            raise json.JSONDecodeError("Expecting value", buf, pos)
+        try:
+            value, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof or len(buf) - pos >= max_record:
+                raise
+            value, end = None, -1
+        # A value touching the end of the buffer may be truncated; read more first
+        if end < 0 or (end == len(buf) and not eof):
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        pos = end
+        if in_array:
+            expect = 'sep'
+        yield value
+
+
+def ensure_kb_exists(kb_path: Path) -> None:
     """
-    # Create directory if it doesn't exist
-    kb_path.parent.mkdir(parents=True, exist_ok=True)
+    Ensure knowledge base exists with headers (CSV) or columns (columnar).
 
-    # Create file with headers if it doesn't exist
-    if not kb_path.exists():
-        with open(kb_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-            writer.writeheader()
+    Args:
+        kb_path: Path to knowledge_base.csv (or a columnar .kb store)
+    """
+    open_kb(kb_path).create(FIELDNAMES)
 
 
-def append_bullets(bullets: List[Dict], kb_path: Path) -> Dict[str, int]:
+def append_bullets(bullets: Iterable[Dict], kb_path: Path, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
     """
-    Append new bullets to knowledge base CSV.
+    Append new bullets to the knowledge base.
+
+    Bullets are consumed one at a time, so a lazy iterable (see
+    iter_stream_bullets) keeps memory bounded. Accepted rows are written and
+    flushed in batches of batch_size.
 
     Args:
-        bullets: List of scanner bullet dictionaries
-        kb_path: Path to knowledge_base.csv
+        bullets: Iterable of scanner bullet dictionaries
+        kb_path: Path to knowledge_base.csv (or a columnar .kb store)
+        batch_size: Number of rows buffered per write
 
     Returns:
         Dictionary with counts: {'added': int, 'skipped': int, 'errors': int}
     """
     stats = {'added': 0, 'skipped': 0, 'errors': 0}
 
-    # Load existing keys for de-duplication
-    existing_keys = load_existing_keys(kb_path)
-
     # Ensure KB file exists
     ensure_kb_exists(kb_path)
 
+    # Open the persistent key index for de-duplication
+    existing_keys = KeyIndex(kb_path)
+
     # Process and append bullets
-    with open(kb_path, 'a', encoding='utf-8', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
-
-        for i, bullet in enumerate(bullets, 1):
-            try:
-                # Normalize the bullet
-                normalized = normalize_bullet(bullet)
-
-                # Validate
-                is_valid, error_msg = validate_bullet(normalized)
-                if not is_valid:
-                    print(f"Error in bullet {i}: {error_msg}", file=sys.stderr)
-                    stats['errors'] += 1
-                    continue
-
-                # Check for duplicate
-                key = (normalized['date'], normalized['company'], normalized['product'])
-                if key in existing_keys:
-                    stats['skipped'] += 1
-                    continue
-
-                # Write new row
-                writer.writerow(normalized)
-                existing_keys.add(key)
-                stats['added'] += 1
-
-            except Exception as e:
-                print(f"Error processing bullet {i}: {e}", file=sys.stderr)
-                stats['errors'] += 1
+    try:
+        _append_rows(bullets, open_kb(kb_path), existing_keys, stats, max(1, batch_size))
+        existing_keys.sync()
+    finally:
+        existing_keys.close()
 
     return stats
 
 
+def _append_rows(bullets: Iterable[Dict], kb: Union[CsvKB, ColumnarKB], existing_keys: KeyIndex,
+                 stats: Dict[str, int], batch_size: int) -> None:
+    """Normalize, validate, de-duplicate and write bullets, updating stats in place."""
+    pending = []
+    i = 0
+    bullet_iter = iter(bullets)
+    while True:
+        try:
+            bullet = next(bullet_iter)
+        except StopIteration:
+            break
+        except json.JSONDecodeError as e:
+            # Malformed stream input: keep what was already accepted, stop here
+            print(f"Error: Invalid JSON in input after bullet {i}: {e}", file=sys.stderr)
+            stats['errors'] += 1
+            break
+        i += 1
+
+        try:
+            # Normalize the bullet
+            normalized = normalize_bullet(bullet)
+
+            # Validate
+            is_valid, error_msg = validate_bullet(normalized)
+            if not is_valid:
+                print(f"Error in bullet {i}: {error_msg}", file=sys.stderr)
+                stats['errors'] += 1
+                continue
+
+            # Check for duplicate
+            key = (normalized['date'], normalized['company'], normalized['product'])
+            if key in existing_keys:
+                stats['skipped'] += 1
+                continue
+
+            # Queue new row
+            pending.append(normalized)
+            existing_keys.add(key)
+            stats['added'] += 1
+
+        except Exception as e:
+            print(f"Error processing bullet {i}: {e}", file=sys.stderr)
+            stats['errors'] += 1
+            continue
+
+        if len(pending) >= batch_size:
+            kb.append(pending)
+            pending.clear()
+
+    kb.append(pending)
+
+
+def print_summary(stats: Dict[str, int]) -> None:
+    """Print the ingestion summary for stats."""
+    print("\n=== Scanner Bullet Ingestion Summary ===")
+    print(f"Rows added:   {stats['added']}")
+    print(f"Rows skipped: {stats['skipped']} (duplicates)")
+    print(f"Errors:       {stats['errors']}")
+    print(f"Total processed: {stats['added'] + stats['skipped'] + stats['errors']}")
+
+
 def main():
     """Main entry point for the script."""
     # Parse command line arguments
-    if len(sys.argv) > 1:
-        input_file = sys.argv[1]
+    parser = argparse.ArgumentParser(description="Ingest scanner bullets into the knowledge base CSV.")
+    parser.add_argument('input_file', nargs='?',
+                        help="JSON input file (default: read from stdin)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Parse input incrementally (NDJSON or JSON array) with bounded memory")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f"Rows buffered per write (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument('--kb', type=Path, default=None,
+                        help=f"Knowledge base to append to: a .csv or a columnar .kb store "
+                             f"(default: {KB_PATH.with_suffix('.kb')} if present, else {KB_PATH})")
+    args = parser.parse_args()
+    input_file = args.input_file
+    kb_path = args.kb or resolve_kb_path(KB_PATH)
+
+    if args.stream:
+        try:
+            f = open(input_file, 'r', encoding='utf-8') if input_file else sys.stdin
+        except FileNotFoundError:
+            print(f"Error: Input file not found: {input_file}", file=sys.stderr)
+            sys.exit(1)
+        try:
+            stats = append_bullets(iter_stream_bullets(f), kb_path, args.batch_size)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        print_summary(stats)
+        if stats['errors'] > 0:
+            sys.exit(1)
+        return
+
+    if input_file:
         try:
             with open(input_file, 'r', encoding='utf-8') as f:
                 data = json.load(f)
@@ -213,18 +490,14 @@ def main():
         sys.exit(1)
 
     # Process bullets
-    stats = append_bullets(bullets, KB_PATH)
+    stats = append_bullets(bullets, kb_path, args.batch_size)
 
     # Print summary
-    print("\n=== Scanner Bullet Ingestion Summary ===")
-    print(f"Rows added:   {stats['added']}")
-    print(f"Rows skipped: {stats['skipped']} (duplicates)")
-    print(f"Errors:       {stats['errors']}")
-    print(f"Total processed: {stats['added'] + stats['skipped'] + stats['errors']}")
+    print_summary(stats)
 
     if stats['errors'] > 0:
         sys.exit(1)
 
 
 if __name__ == '__main__':
-    main()
+    run_main(main, 'ingest_scanner_bullets')
@@ -1,4 +1,4 @@
-param([Parameter(Mandatory=$true)][ValidateSet("setup","lint","test","run-week","audit","clean")]$Target)
+param([Parameter(Mandatory=$true)][ValidateSet("setup","lint","test","run-week","audit","bench","clean")]$Target)
 switch ($Target) {
  "setup" {
    if (-not (Test-Path ".venv")) { python -m venv .venv }
@@ -14,6 +14,9 @@ switch ($Target) {
  "audit" {
    python agents\auditor.py; python agents\cleaner.py
  }
+ "bench" {
+   python bench\run_bench.py --sizes 1000
+ }
  "clean" {
    Remove-Item -Recurse -Force 01_raw_scans,02_structured,03_analysis,04_comparisons,05_strategy,AUDIT,BLOCKER.md,.venv -ErrorAction SilentlyContinue
  }
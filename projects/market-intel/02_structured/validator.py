@@ -1,10 +1,12 @@
 ﻿print("Running validator.py...")
-import csv, sys, os
-kb = os.path.join("02_structured","knowledge_base.csv")
+import sys, os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.kb_store import open_kb, resolve_kb_path
+kb = resolve_kb_path(os.path.join("02_structured","knowledge_base.csv"))
 if not os.path.exists(kb):
     print("❌ KB not found"); sys.exit(1)
-with open(kb, newline="", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
-valid = [r for r in rows if all([r.get("date"), r.get("company"), r.get("product")])]
-print(f"✅ Valid rows: {len(valid)} / {len(rows)}")
+total = valid = 0
+for r in open_kb(kb).scan(columns=["date","company","product"]):
+    total += 1
+    valid += all([r["date"], r["company"], r["product"]])
+print(f"✅ Valid rows: {valid} / {total}")
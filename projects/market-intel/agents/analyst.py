@@ -1,18 +1,67 @@
-import argparse, json, os
+import argparse, glob, os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.signals_reader import SignalsReader
+from tools.profiling import run_main
+
+class FindingsWriter:
+    """Stream findings to <outdir>/findings.md through a buffered writer.
+
+    With page_bytes > 0, once a page passes that many characters it moves to
+    findings_0001.md, findings_0002.md, ... and findings.md becomes an index
+    of the pages and the citation range each one holds.
+    """
+    def __init__(self, outdir, page_bytes=0, bufsize=1<<20):
+        self.outdir, self.page_bytes, self.bufsize = outdir, page_bytes, bufsize
+        for old in glob.glob(os.path.join(outdir,"findings_[0-9][0-9][0-9][0-9].md")):
+            os.remove(old)
+        self.pages=[]  # [name, first, last]
+        self.count=0
+        self.page_first=1  # citation number of the current page's first finding
+        self._open(os.path.join(outdir,"findings.md"))
+
+    def _open(self, path):
+        self.f=open(path,"w",encoding="utf-8",buffering=self.bufsize)
+        self.size=self.f.write("# Findings\n\n")
+
+    def page_name(self, n):
+        return f"findings_{n:04d}.md"
+
+    def write(self, line):
+        if self.page_bytes and self.size>=self.page_bytes and self.count>=self.page_first:
+            self.f.close()
+            if not self.pages:
+                os.replace(os.path.join(self.outdir,"findings.md"), os.path.join(self.outdir,self.page_name(1)))
+                self.pages.append([self.page_name(1), 1, self.count])
+            else:
+                self.pages[-1][2]=self.count
+            self.page_first=self.count+1
+            self.pages.append([self.page_name(len(self.pages)+1), self.page_first, None])
+            self._open(os.path.join(self.outdir,self.pages[-1][0]))
+        self.count+=1
+        self.size+=self.f.write(line+"\n")
+
+    def close(self):
+        if not self.count:
+            self.f.write("- NONE\n")
+        self.f.close()
+        if self.pages:
+            self.pages[-1][2]=self.count
+            with open(os.path.join(self.outdir,"findings.md"),"w",encoding="utf-8") as f:
+                f.write(f"# Findings\n\n{self.count} findings in {len(self.pages)} pages; each finding cites its evidence: path#locator.\n\n")
+                f.write("".join(f"- {name}: [{a}]–[{b}]\n" for name,a,b in self.pages))
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--signals", default="02_structured/signals.jsonl")
     ap.add_argument("--outdir", default="03_analysis")
+    ap.add_argument("--page_bytes", type=int, default=0, help="split findings into findings_NNNN.md pages of about this size, with findings.md as their index (0 = one file)")
     args=ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
-    findings=[]
-    with open(args.signals,"r",encoding="utf-8") as f:
-        for i,line in enumerate(f,1):
-            s=json.loads(line)
-            findings.append(f"- [{i}] {s['entity']} — {s['claim']} (evidence: {s['evidence_path']}#{s['evidence_locator']})")
-    with open(os.path.join(args.outdir,"findings.md"),"w",encoding="utf-8") as f:
-        f.write("# Findings\n\n" + ("\n".join(findings) if findings else "- NONE") + "\n")
+    out=FindingsWriter(args.outdir, args.page_bytes)
+    with SignalsReader(args.signals) as sigs:
+        for i,s in enumerate(sigs,1):
+            out.write(f"- [{i}] {s['entity']} — {s['claim']} (evidence: {s['evidence_path']}#{s['evidence_locator']})")
+    out.close()
     implications=["- Check integration impact (WES/WCS).","- Validate lead times with vendor rep.","- Assess retrofit vs greenfield fit."]
     with open(os.path.join(args.outdir,"implications.md"),"w",encoding="utf-8") as f:
         f.write("# Implications\n\n"+ "\n".join(implications) + "\n")
@@ -21,4 +70,4 @@ def main():
     print("analyst: findings + implications generated")
 
 if __name__=="__main__":
-    main()
+    run_main(main, "analyst")
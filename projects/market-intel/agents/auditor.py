@@ -1,31 +1,144 @@
-import argparse, os, glob
+import argparse, os, glob, re, sys, json, hashlib
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.signals_reader import SignalsReader
+from tools.profiling import run_main
+
+# Every rule's trigger in one alternation, matched once per line; group names say which rule fired.
+# The citation pattern is a zero-width lookahead so words inside a cited line are still matched.
+MATCHER=re.compile("|".join([
+    r"^(?=- \[(?P<cite_n>\d+)\] (?P<cite_entity>.*?) — )",
+    r"(?P<unknown>UNKNOWN)",
+    r"(?P<claim>Recommendation|Findings)",
+    r"(?P<evidence>evidence:|EVIDENCED)",
+]))
+MAX_LINES_SHOWN=20
+# bump when MATCHER or the rules in audit_file() change so cached results are discarded
+RULESET_VERSION=2
+_sigs=None
+
+def scan(fp):
+    """Stream fp through MATCHER.
+
+    Returns ({rule: [(line, byte start, byte end)]}, [(line, n, entity, byte start, byte end)] citations);
+    byte offsets are from the start of the file, citation spans cover the "[n]".
+    """
+    hits={"unknown":[],"claim":[],"evidence":[]}
+    cites=[]
+    pos=0
+    with open(fp,"rb",buffering=1<<20) as f:
+        for ln,raw in enumerate(f,1):
+            line=raw.decode("utf-8")
+            at=(lambda i, pos=pos: pos+i) if len(line)==len(raw) else (lambda i, pos=pos, line=line: pos+len(line[:i].encode("utf-8")))
+            for m in MATCHER.finditer(line):
+                if m.lastgroup=="cite_entity":
+                    cites.append((ln,int(m["cite_n"]),m["cite_entity"],at(m.start("cite_n")-1),at(m.end("cite_n")+1)))
+                else:
+                    hits[m.lastgroup].append((ln,at(m.start()),at(m.end())))
+            pos+=len(raw)
+    return hits, cites
+
+def lines_note(lines):
+    shown=", ".join(f"L{n}" for n in lines[:MAX_LINES_SHOWN])
+    return f" ({shown}{f' +{len(lines)-MAX_LINES_SHOWN} more' if len(lines)>MAX_LINES_SHOWN else ''})" if lines else ""
+
+def audit_file(fp):
+    """Issues for one file as (file, rule, severity, message, line numbers, byte spans), plus whether it cites signals."""
+    hits,cites=scan(fp)
+    issues=[]
+    if hits["unknown"]:
+        issues.append((fp,"unknown","MEDIUM","UNKNOWN cells present",
+                       [h[0] for h in hits["unknown"]],[[a,b] for _,a,b in hits["unknown"]]))
+    if hits["claim"] and not hits["evidence"]:
+        issues.append((fp,"missing_evidence","HIGH","Missing explicit evidence refs",
+                       sorted({h[0] for h in hits["claim"]}),[[a,b] for _,a,b in hits["claim"]]))
+    if _sigs is not None:
+        # analyst citations "- [n] entity — ..." must point at signals row n for that entity
+        for ln,n,ent,a,b in cites:
+            if not 1<=n<=len(_sigs) or _sigs[n-1].get("entity")!=ent:
+                issues.append((fp,"citation","HIGH",f"Citation [{n}] does not match a signals row",[ln],[[a,b]]))
+    return issues, bool(cites)
+
+def open_signals(path):
+    global _sigs
+    _sigs=SignalsReader(path) if path and os.path.exists(path) else None
+
+def audit_all(paths, signals, workers):
+    """audit_file() each path, over a process pool when workers>1; results keep input order."""
+    if workers<=1 or len(paths)<2:
+        open_signals(signals)
+        try:
+            return [audit_file(p) for p in paths]
+        finally:
+            if _sigs is not None: _sigs.close()
+    workers=min(workers, len(paths))
+    with ProcessPoolExecutor(max_workers=workers, initializer=open_signals, initargs=(signals,)) as pool:
+        return list(pool.map(audit_file, paths, chunksize=max(1, len(paths)//(workers*4))))
+
+def file_hash(p):
+    h=hashlib.sha256()
+    with open(p,"rb") as f:
+        for b in iter(lambda: f.read(1<<20), b""): h.update(b)
+    return h.hexdigest()
+
+def signals_fingerprint(p):
+    """size:mtime of the signals file; citation results are only reused while it is unchanged."""
+    try:
+        st=os.stat(p); return f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        return "MISSING"
+
+def load_cache(p):
+    try:
+        cache=json.load(open(p,"r",encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return cache.get("files",{}) if cache.get("version")==RULESET_VERSION else {}
+
+def save_cache(p, files):
+    tmp=p+".tmp"
+    with open(tmp,"w",encoding="utf-8") as f: json.dump({"version":RULESET_VERSION,"files":files},f)
+    os.replace(tmp,p)
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--rubric", default="00_instructions/rubric_success_criteria.md")
     ap.add_argument("--outdir", default="AUDIT")
+    ap.add_argument("--signals", default="02_structured/signals.jsonl")
+    ap.add_argument("--workers", type=int, default=1, help="files audited in parallel processes")
+    ap.add_argument("--cache", default=None, help="per-file result cache (default: <outdir>/audit_cache.json)")
+    ap.add_argument("--full", action="store_true", help="ignore the cache and re-audit every file")
     args=ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
-    issues=[]
-    for fp in glob.glob("03_analysis/*.md")+glob.glob("04_comparisons/*.md")+glob.glob("05_strategy/*.md"):
-        txt=open(fp,"r",encoding="utf-8").read()
-        if "UNKNOWN" in txt:
-            issues.append((fp,"MEDIUM","UNKNOWN cells present"))
-        if ("Recommendation" in txt or "Findings" in txt) and ("evidence:" not in txt and "EVIDENCED" not in txt):
-            issues.append((fp,"HIGH","Missing explicit evidence refs"))
+    paths=glob.glob("03_analysis/*.md")+glob.glob("04_comparisons/*.md")+glob.glob("05_strategy/*.md")
+    cachep=args.cache or os.path.join(args.outdir,"audit_cache.json")
+    old={} if args.full else load_cache(cachep)
+    sigfp=signals_fingerprint(args.signals)
+    hashes={p:file_hash(p) for p in paths}
+    # reuse a file's issues while its bytes (and, if it cites signals, the signals file) are unchanged
+    stale=[p for p in paths if not (p in old and old[p]["hash"]==hashes[p] and old[p]["signals"] in (None, sigfp))]
+    files={p:old[p] for p in paths if p not in stale}
+    for p,(found,cited) in zip(stale, audit_all(stale, args.signals, args.workers)):
+        files[p]={"hash":hashes[p],"signals":sigfp if cited else None,"issues":found}
+    save_cache(cachep, files)
+    issues=[i for p in paths for i in files[p]["issues"]]
     with open(os.path.join(args.outdir,"audit_report.md"),"w",encoding="utf-8") as f:
         f.write("# Audit Report\n\n")
         if not issues: f.write("- No issues found (basic checks)\n")
-        for fp,sev,msg in issues:
-            f.write(f"- [{sev}] {fp}: {msg}\n")
+        for fp,rule,sev,msg,lines,spans in issues:
+            f.write(f"- [{sev}] {fp}: {msg}{lines_note(lines)}\n")
     with open(os.path.join(args.outdir,"prompt_patch.md"),"w",encoding="utf-8") as f:
         f.write("# Prompt Patch\n\n")
-        for fp,sev,msg in issues:
-            if "UNKNOWN" in msg:
+        for fp,rule,sev,msg,lines,spans in issues:
+            if rule=="unknown":
                 f.write(f"- In `{fp}` replace `UNKNOWN` cells with `ESTIMATE_W_REASON` including method note, or provide `EVIDENCED: path#locator`.\n")
-            if "Missing explicit evidence" in msg:
+            if rule=="missing_evidence":
                 f.write(f"- In `{fp}` add evidence references for each claim using `path#locator` notation.\n")
-    print("auditor: audit_report + prompt_patch written")
+    # the same patch for tools: one record per issue with its line numbers and byte spans
+    with open(os.path.join(args.outdir,"prompt_patch.jsonl"),"w",encoding="utf-8") as f:
+        f.write("".join(json.dumps({"file":fp,"rule":rule,"severity":sev,"message":msg,"lines":lines,"spans":spans,"sha256":files[fp]["hash"]})+"\n"
+                        for fp,rule,sev,msg,lines,spans in issues))
+    print(f"auditor: audit_report + prompt_patch (.md, .jsonl) written ({len(stale)} files audited, {len(paths)-len(stale)} cached)")
 
 if __name__=="__main__":
-    main()
+    run_main(main, "auditor")
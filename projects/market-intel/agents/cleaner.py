@@ -1,38 +1,74 @@
-import argparse, os, re, glob
+import argparse, os, re, json, hashlib, sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.profiling import run_main
+
+ESTIMATE=b"ESTIMATE_W_REASON: method note TBD"
+EVIDENCE_NOTE=b"\n\n> evidence: add `path#locator` per claim.\n"
+FIXES={"unknown":"UNKNOWN→ESTIMATE_W_REASON","missing_evidence":"add evidence refs note"}
+
+def load_edits(patch):
+    """file -> {rule: byte spans or None} in patch order.
+
+    Reads the structured <patch>.jsonl written next to the markdown patch when
+    present; otherwise falls back to parsing the markdown (no spans).
+    """
+    edits={}
+    jsonl=os.path.splitext(patch)[0]+".jsonl"
+    if os.path.exists(jsonl):
+        for line in open(jsonl,"r",encoding="utf-8"):
+            if not line.strip(): continue
+            e=json.loads(line)
+            if e["rule"] in FIXES:
+                edits.setdefault(e["file"],{})[e["rule"]]=(e.get("spans"), e.get("sha256"))
+        return edits
+    for line in open(patch,"r",encoding="utf-8").read().splitlines():
+        m=re.match(r"- In `(.*?)` replace `UNKNOWN`", line)
+        if m: edits.setdefault(m.group(1),{})["unknown"]=(None, None)
+        m2=re.match(r"- In `(.*?)` add evidence references", line)
+        if m2: edits.setdefault(m2.group(1),{})["missing_evidence"]=(None, None)
+    return edits
+
+def replace_unknown(data, spans):
+    """Replace UNKNOWN at the audited byte spans, or everywhere if the spans no longer line up."""
+    if spans and all(data[a:b]==b"UNKNOWN" for a,b in spans):
+        out=[]; pos=0
+        for a,b in sorted(spans):
+            out.append(data[pos:a]); out.append(ESTIMATE); pos=b
+        out.append(data[pos:])
+        return b"".join(out)
+    return data.replace(b"UNKNOWN", ESTIMATE)
+
+def apply_edits(fp, rules):
+    """Apply every edit for fp in one read-modify-write of <fp>_cleaned; returns fix_log entries."""
+    if not os.path.exists(fp): return []
+    data=open(fp,"rb").read()
+    digest=hashlib.sha256(data).hexdigest()
+    new=data
+    for rule,(spans,sha) in rules.items():
+        if rule=="unknown":
+            new=replace_unknown(new, spans if sha==digest else None)
+        elif rule=="missing_evidence" and b"evidence:" not in data:
+            new=new+EVIDENCE_NOTE
+    out=fp.replace(".md","_cleaned.md").replace(".csv","_cleaned.csv")
+    tmp=out+".tmp"
+    with open(tmp,"wb") as f: f.write(new)
+    os.replace(tmp,out)
+    return [(fp,out,FIXES[rule]) for rule in rules]
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--patch", default="AUDIT/prompt_patch.md")
     ap.add_argument("--outdir", default="AUDIT")
+    ap.add_argument("--workers", type=int, default=8, help="files patched concurrently")
     args=ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
-    patch=open(args.patch,"r",encoding="utf-8").read().splitlines()
-    changes=[]
-    for line in patch:
-        m=re.match(r"- In `(.*?)` replace `UNKNOWN`", line)
-        if m:
-            fp=m.group(1)
-            if os.path.exists(fp):
-                txt=open(fp,"r",encoding="utf-8").read()
-                new=txt.replace("UNKNOWN","ESTIMATE_W_REASON: method note TBD")
-                out=fp.replace(".md","_cleaned.md").replace(".csv","_cleaned.csv")
-                open(out,"w",encoding="utf-8").write(new)
-                changes.append((fp,out,"UNKNOWN→ESTIMATE_W_REASON"))
-        m2=re.match(r"- In `(.*?)` add evidence references", line)
-        if m2:
-            fp=m2.group(1)
-            if os.path.exists(fp):
-                txt=open(fp,"r",encoding="utf-8").read()
-                if "evidence:" not in txt:
-                    new=txt + "\n\n> evidence: add `path#locator` per claim.\n"
-                else:
-                    new=txt
-                out=fp.replace(".md","_cleaned.md")
-                open(out,"w",encoding="utf-8").write(new)
-                changes.append((fp,out,"add evidence refs note"))
+    edits=load_edits(args.patch)
+    with ThreadPoolExecutor(max_workers=max(1,args.workers)) as pool:
+        changes=[c for per_file in pool.map(lambda kv: apply_edits(*kv), edits.items()) for c in per_file]
     with open(os.path.join(args.outdir,"fix_log.md"),"w",encoding="utf-8") as f:
         for a,b,c in changes: f.write(f"{a} -> {b} | {c}\n")
     print("cleaner: applied basic patch; see fix_log.md")
 
 if __name__=="__main__":
-    main()
+    run_main(main, "cleaner")
@@ -1,48 +1,80 @@
-import argparse, json, os, csv
+import argparse, json, os, csv, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.signals_reader import SignalsReader
+from tools.profiling import run_main
 
-def main():
-    ap=argparse.ArgumentParser()
-    ap.add_argument("--criteria", default="04_comparisons/comparison_criteria.json")
-    ap.add_argument("--signals", default="02_structured/signals.jsonl")
-    ap.add_argument("--outdir", default="04_comparisons")
-    ap.add_argument("--set_slug", default="AMR_vendors_demo")
-    args=ap.parse_args()
-
-    os.makedirs(args.outdir, exist_ok=True)
-    crit=json.load(open(args.criteria,"r",encoding="utf-8"))["criteria"]
-    vendors=set()
-    sigs=[]
-    with open(args.signals,"r",encoding="utf-8") as f:
-        for line in f:
-            s=json.loads(line); vendors.add(s["entity"]); sigs.append(s)
-    vendors=sorted(list(vendors))[:3] or ["V1","V2","V3"]
+def index_signals(path, crit):
+    """One pass over signals: entity -> first signal, (entity, criterion) -> first signal whose impact_area is that criterion."""
+    first={}; by_crit={}
+    crit=set(crit)
+    with SignalsReader(path) as reader:
+        for s in reader:
+            first.setdefault(s["entity"], s)
+            if s.get("impact_area") in crit:
+                by_crit.setdefault((s["entity"], s["impact_area"]), s)
+    return first, by_crit
 
+def build_rows(vendors, crit, first, by_crit):
     rows=[]
     for v in vendors:
         row={"vendor":v}
         for c in crit:
-            evid=[s for s in sigs if s["entity"]==v]
-            if evid:
-                ref=f"{evid[0]['evidence_path']}#{evid[0]['evidence_locator']}"
-                row[c]=f"EVIDENCED: {ref}"
-            else:
-                row[c]="UNKNOWN"
+            s=by_crit.get((v,c)) or first.get(v)
+            row[c]=f"EVIDENCED: {s['evidence_path']}#{s['evidence_locator']}" if s else "UNKNOWN"
         row[crit[0]]="ESTIMATE_W_REASON: extrapolated from similar deployments"
         rows.append(row)
+    return rows
 
-    mdp=os.path.join(args.outdir,f"{args.set_slug}.md")
+def write_set(outdir, slug, crit, rows):
+    """Write <slug>.md and <slug>.csv; returns their paths."""
+    mdp=os.path.join(outdir,f"{slug}.md")
     with open(mdp,"w",encoding="utf-8") as f:
-        f.write(f"# Comparison — {args.set_slug}\n\nLegend: EVIDENCED / ESTIMATE_W_REASON / UNKNOWN\n\n")
+        f.write(f"# Comparison — {slug}\n\nLegend: EVIDENCED / ESTIMATE_W_REASON / UNKNOWN\n\n")
         f.write("| vendor | " + " | ".join(crit) + " |\n")
         f.write("|---|" + "|".join(["---"]*len(crit)) + "|\n")
-        for r in rows:
-            f.write("| " + " | ".join([r['vendor']]+[r[c] for c in crit]) + " |\n")
-    csvp=os.path.join(args.outdir,f"{args.set_slug}.csv")
+        f.write("".join("| " + " | ".join([r['vendor']]+[r[c] for c in crit]) + " |\n" for r in rows))
+    csvp=os.path.join(outdir,f"{slug}.csv")
     with open(csvp,"w",encoding="utf-8",newline="") as f:
         w=csv.DictWriter(f, fieldnames=["vendor"]+crit); w.writeheader(); w.writerows(rows)
-    with open(os.path.join(args.outdir,"comparisons_index.md"),"w",encoding="utf-8") as f:
-        f.write(f"# Comparisons Index\n\n- {args.set_slug}: {mdp}\n")
-    print(f"comparator: wrote {mdp} and {csvp}")
+    return mdp, csvp
+
+def update_index(path, entries):
+    """Merge {slug: md path} into comparisons_index.md, keeping sets written by earlier runs."""
+    merged={}
+    if os.path.exists(path):
+        for line in open(path,"r",encoding="utf-8"):
+            if line.startswith("- ") and ": " in line:
+                slug,mdp=line[2:].rstrip("\n").split(": ",1); merged[slug]=mdp
+    merged.update(entries)
+    with open(path,"w",encoding="utf-8") as f:
+        f.write("# Comparisons Index\n\n" + "".join(f"- {k}: {v}\n" for k,v in merged.items()))
+
+def main():
+    ap=argparse.ArgumentParser()
+    ap.add_argument("--criteria", default="04_comparisons/comparison_criteria.json")
+    ap.add_argument("--signals", default="02_structured/signals.jsonl")
+    ap.add_argument("--outdir", default="04_comparisons")
+    ap.add_argument("--set_slug", default="AMR_vendors_demo")
+    ap.add_argument("--sets", help='manifest {"sets":[{"slug":..., "entities":[...]?, "criteria":[...]?}]}; renders every set from one read of the signals')
+    ap.add_argument("--max_vendors", type=int, default=0, help="limit rows to the first N vendors (0 = all)")
+    args=ap.parse_args()
+
+    os.makedirs(args.outdir, exist_ok=True)
+    crit=json.load(open(args.criteria,"r",encoding="utf-8"))["criteria"]
+    sets=json.load(open(args.sets,"r",encoding="utf-8"))["sets"] if args.sets else [{"slug":args.set_slug}]
+    allcrit=list(dict.fromkeys(c for st in sets for c in st.get("criteria") or crit))
+    first, by_crit = index_signals(args.signals, allcrit)
+
+    entries={}
+    for st in sets:
+        vendors=list(st["entities"]) if st.get("entities") else sorted(first)
+        if args.max_vendors: vendors=vendors[:args.max_vendors]
+        vendors=vendors or ["V1","V2","V3"]
+        scrit=list(st.get("criteria") or crit)
+        mdp,csvp=write_set(args.outdir, st["slug"], scrit, build_rows(vendors, scrit, first, by_crit))
+        entries[st["slug"]]=mdp
+        print(f"comparator: wrote {mdp} and {csvp}")
+    update_index(os.path.join(args.outdir,"comparisons_index.md"), entries)
 
 if __name__=="__main__":
-    main()
+    run_main(main, "comparator")
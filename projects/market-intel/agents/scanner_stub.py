@@ -1,29 +1,86 @@
-import argparse, os, shutil, glob, datetime, subprocess, sys
+import argparse, os, glob, datetime, subprocess, hashlib, json, uuid, sys
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.profiling import run_main
+
+def copy_and_hash(src, dst, bufsize=1<<20):
+    """Copy src to dst and SHA-256 the bytes in the same read pass."""
+    h=hashlib.sha256()
+    with open(src,"rb") as fi, open(dst,"wb") as fo:
+        for b in iter(lambda: fi.read(bufsize), b""):
+            h.update(b); fo.write(b)
+    return h.hexdigest()
+
+def write_sidecar(dst, digest):
+    """Write <dst>.meta.json in the same shape as tools/hash_sidecar.sh."""
+    meta={"source_url":"","collected_at":datetime.datetime.utcnow().replace(microsecond=0).isoformat()+"Z","collector":"unknown","hash_sha256":digest}
+    with open(dst+".meta.json","w",encoding="utf-8") as f:
+        f.write(json.dumps(meta)+"\n")
+
+def store_blob(src, objdir):
+    """Copy src into the content-addressed store objdir/<h[:2]>/<h>.raw.md.
+
+    Returns (digest, blob path, True if the blob is new); identical bytes are stored once.
+    """
+    os.makedirs(objdir, exist_ok=True)
+    tmp=os.path.join(objdir, f".incoming_{uuid.uuid4().hex}.tmp")
+    try:
+        digest=copy_and_hash(src, tmp)
+        blob=os.path.join(objdir, digest[:2], digest+".raw.md")
+        if os.path.exists(blob):
+            return digest, blob, False
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        os.replace(tmp, blob)
+        return digest, blob, True
+    finally:
+        if os.path.exists(tmp): os.remove(tmp)
+
+def link_blob(blob, dst):
+    """Make dst a hard link to blob (a plain copy where links are unsupported)."""
+    if os.path.lexists(dst): os.remove(dst)
+    try:
+        os.link(blob, dst)
+    except OSError:
+        copy_and_hash(blob, dst)
+
+def collect(fp, dst, hash_tool, objdir=None):
+    """Collect one file; returns True if it added new bytes to the store."""
+    new=True
+    if objdir:
+        digest,blob,new=store_blob(fp, objdir)
+        link_blob(blob, dst)
+    else:
+        digest=copy_and_hash(fp, dst)
+    if hash_tool:
+        subprocess.check_call([hash_tool, dst])
+    else:
+        write_sidecar(dst, digest)
+    return new
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--fixtures", default="tests/fixtures/01_raw_scans_sample")
     ap.add_argument("--outdir", default="01_raw_scans")
-    ap.add_argument("--hash_tool", default="tools/hash_sidecar.sh")
+    ap.add_argument("--hash_tool", default="", help="external sidecar script (e.g. tools/hash_sidecar.sh); default: native")
+    ap.add_argument("--workers", type=int, default=8, help="files copied/hashed concurrently")
+    ap.add_argument("--layout", choices=["copy","cas"], default="copy",
+                    help="cas: store bytes once under <outdir>/objects/ by SHA-256; dated names become hard links")
     args=ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
     idx=os.path.join(args.outdir,"scanner_index.md")
     date=datetime.datetime.utcnow().strftime("%Y%m%d")
-    count=0
+    jobs=[]
     for i, fp in enumerate(sorted(glob.glob(os.path.join(args.fixtures,"*.raw.md"))),1):
         slug=os.path.splitext(os.path.basename(fp))[0]
         dst=os.path.join(args.outdir, f"{date}_{slug}_{i:02d}.raw.md")
-        shutil.copyfile(fp, dst)
-        # sidecar
-        if os.name == "nt":
-            subprocess.check_call(["powershell","-ExecutionPolicy","Bypass","-File","tools/hash_sidecar.ps1", dst])
-        else:
-            subprocess.check_call([args.hash_tool, dst])
-        # index
-        with open(idx,"a",encoding="utf-8") as f:
-            f.write(f"- {os.path.basename(dst)} | fixture:{slug}\n")
-        count+=1
-    print(f"scanner_stub: copied {count} items to {args.outdir}")
+        jobs.append((fp, dst, slug))
+    objdir=os.path.join(args.outdir,"objects") if args.layout=="cas" else None
+    with ThreadPoolExecutor(max_workers=max(1,args.workers)) as pool:
+        new=sum(pool.map(lambda j: collect(j[0], j[1], args.hash_tool, objdir), jobs))
+    # index: one buffered append in fixture order
+    with open(idx,"a",encoding="utf-8") as f:
+        f.write("".join(f"- {os.path.basename(dst)} | fixture:{slug}\n" for _,dst,slug in jobs))
+    print(f"scanner_stub: copied {len(jobs)} items to {args.outdir}" + (f" ({new} new blobs, {len(jobs)-new} deduplicated)" if objdir else ""))
 
 if __name__=="__main__":
-    main()
+    run_main(main, "scanner")
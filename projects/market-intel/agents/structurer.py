@@ -1,64 +1,154 @@
-import argparse, json, os, re, csv, subprocess, sys, glob
+import argparse, json, os, re, csv, sys, glob, hashlib
+from concurrent.futures import ProcessPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.jsonl_schema import validate_file
+from tools.profiling import run_main
 
 def first_sentence(txt):
     import re
     m=re.split(r'(?<=[.!?])\s+', txt.strip(), maxsplit=1)
     return m[0] if m else txt.strip()
 
+def doc_hash(path):
+    """SHA-256 of a raw scan, taken from its .meta.json sidecar when present."""
+    try:
+        with open(path+".meta.json","r",encoding="utf-8-sig") as f:
+            h=json.load(f).get("hash_sha256")
+        if h: return h
+    except (OSError, ValueError):
+        pass
+    h=hashlib.sha256()
+    with open(path,"rb") as f:
+        for b in iter(lambda:f.read(1<<20), b""): h.update(b)
+    return h.hexdigest()
+
+def extract(path):
+    """Build the signal row for one raw scan."""
+    with open(path,"r",encoding="utf-8") as f:
+        lines=f.readlines()
+    title=lines[0].strip() if lines else os.path.basename(path)
+    claim=first_sentence("".join(lines[1:]) or title)
+    return {
+        "entity": re.sub(r'[^A-Za-z0-9]+','_', title.split(" ")[0]).strip("_") or "UNKNOWN",
+        "product": "UNKNOWN",
+        "event_type": "unspecified",
+        "event_date": "UNKNOWN",
+        "claim": claim[:280],
+        "evidence_path": path,
+        "evidence_locator": "L2-L5" if len(lines)>=5 else f"L1-L{max(1,len(lines))}",
+        "confidence": "low",
+        "market_segment": "parcel/e-fulfillment",
+        "geography": "UNKNOWN",
+        "impact_area": "UNKNOWN"
+    }
+
+# bump when extract() changes so cached rows are rebuilt
+EXTRACTOR_VERSION=1
+# an empty scan's row comes from its file name, so it is never reused for another document
+EMPTY_SHA256=hashlib.sha256(b"").hexdigest()
+
+def extract_all(paths, workers):
+    """extract() each path, fanned out over a process pool when workers>1; results keep input order."""
+    if workers<=1 or len(paths)<2:
+        return [extract(p) for p in paths]
+    workers=min(workers, len(paths))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(extract, paths, chunksize=max(1, len(paths)//(workers*4))))
+
+def load_cache(p):
+    try:
+        cache=json.load(open(p,"r",encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    return cache.get("docs",{}) if cache.get("version")==EXTRACTOR_VERSION else {}
+
+def summary_path(outdir, path):
+    slug=os.path.basename(path).replace(".raw.md","")
+    return slug, os.path.join(outdir,"doc_summaries", f"{slug}.md")
+
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--inputs", default="01_raw_scans/*.raw.md")
     ap.add_argument("--schema", default="02_structured/structurer_schema.json")
     ap.add_argument("--outdir", default="02_structured")
+    ap.add_argument("--dedup", action="store_true", help="skip raw scans whose content hash was already seen (re-collected documents)")
+    ap.add_argument("--cache", default=None, help="per-document cache (default: <outdir>/structurer_cache.json)")
+    ap.add_argument("--full", action="store_true", help="ignore the cache and re-extract every document")
+    ap.add_argument("--workers", type=int, default=1, help="extraction processes (output is identical to a serial run)")
     args=ap.parse_args()
     os.makedirs(args.outdir, exist_ok=True)
+    cachep=args.cache or os.path.join(args.outdir,"structurer_cache.json")
+    old={} if args.full else load_cache(cachep)
+    paths=sorted(glob.glob(args.inputs))
+    hashes={p:doc_hash(p) for p in paths}
+    changed=[p for p in paths if old.get(p,{}).get("hash")!=hashes[p]]
+    # with --dedup, a document whose content was already extracted (cached, or earlier in
+    # this run) reuses that row, pointed at its own path, instead of being extracted again
+    known={d["hash"]:d["row"] for d in old.values()} if args.dedup else {}
+    todo=[]; first={}
+    for p in changed:
+        h=hashes[p]
+        if args.dedup and h!=EMPTY_SHA256 and (h in known or h in first): continue
+        first.setdefault(h,p); todo.append(p)
+    fresh=dict(zip(todo, extract_all(todo, args.workers)))
+    for p in changed:
+        if p not in fresh:
+            h=hashes[p]
+            fresh[p]=dict(known[h] if h in known else fresh[first[h]], evidence_path=p)
+    docs={}
     rows=[]
-    for path in sorted(glob.glob(args.inputs)):
-        with open(path,"r",encoding="utf-8") as f:
-            lines=f.readlines()
-        title=lines[0].strip() if lines else os.path.basename(path)
-        claim=first_sentence("".join(lines[1:]) or title)
-        row={
-            "entity": re.sub(r'[^A-Za-z0-9]+','_', title.split(" ")[0]).strip("_") or "UNKNOWN",
-            "product": "UNKNOWN",
-            "event_type": "unspecified",
-            "event_date": "UNKNOWN",
-            "claim": claim[:280],
-            "evidence_path": path,
-            "evidence_locator": "L2-L5" if len(lines)>=5 else f"L1-L{max(1,len(lines))}",
-            "confidence": "low",
-            "market_segment": "parcel/e-fulfillment",
-            "geography": "UNKNOWN",
-            "impact_area": "UNKNOWN"
-        }
-        rows.append(row)
+    seen=set()
+    for path in paths:
+        h=hashes[path]
+        row=fresh[path] if path in fresh else old[path]["row"]
+        emit=not (args.dedup and h in seen)
+        seen.add(h)
+        docs[path]={"hash":h,"row":row,"emitted":emit}
+        if emit: rows.append(row)
+    dropped=[p for p,d in old.items() if d.get("emitted") and not docs.get(p,{}).get("emitted")]
+    newly=[p for p,d in docs.items() if d["emitted"] and not old.get(p,{}).get("emitted")]
 
     jsonl=os.path.join(args.outdir,"signals.jsonl")
+    csvp=os.path.join(args.outdir,"signals.csv")
+    manifest=os.path.join(args.outdir,"structured_manifest.md")
+    if not (changed or dropped or newly) and all(os.path.exists(p) for p in (jsonl,csvp,manifest)):
+        print(f"structurer: {len(rows)} documents unchanged; outputs left as is")
+        return
+
     with open(jsonl,"w",encoding="utf-8") as f:
         for r in rows: f.write(json.dumps(r,ensure_ascii=False)+"\n")
 
-    csvp=os.path.join(args.outdir,"signals.csv")
     with open(csvp,"w",encoding="utf-8",newline="") as f:
         if rows:
             w=csv.DictWriter(f, fieldnames=list(rows[0].keys()))
             w.writeheader(); w.writerows(rows)
 
+    # summaries: rewrite only re-extracted or missing ones, drop those of removed documents
     os.makedirs(os.path.join(args.outdir,"doc_summaries"), exist_ok=True)
+    rewrite=set(changed)|set(newly)
     for r in rows:
-        slug=os.path.basename(r["evidence_path"]).replace(".raw.md","")
-        with open(os.path.join(args.outdir,"doc_summaries", f"{slug}.md"),"w",encoding="utf-8") as f:
-            f.write(f"# {slug}\n\n- Entity: {r['entity']}\n- Event: {r['event_type']}\n- Claim: {r['claim']}\n- Evidence: {r['evidence_path']}#{r['evidence_locator']}\n")
+        slug,sp=summary_path(args.outdir, r["evidence_path"])
+        if r["evidence_path"] in rewrite or not os.path.exists(sp):
+            with open(sp,"w",encoding="utf-8") as f:
+                f.write(f"# {slug}\n\n- Entity: {r['entity']}\n- Event: {r['event_type']}\n- Claim: {r['claim']}\n- Evidence: {r['evidence_path']}#{r['evidence_locator']}\n")
+    for p in dropped:
+        sp=summary_path(args.outdir, p)[1]
+        if os.path.exists(sp): os.remove(sp)
 
-    manifest=os.path.join(args.outdir,"structured_manifest.md")
     with open(manifest,"w",encoding="utf-8") as f:
         f.write(f"# Structured Manifest\n\n- rows: {len(rows)}\n")
 
-    # validate
-    code=subprocess.call([sys.executable,"tools/validate_jsonl.py","--schema",args.schema,"--input",jsonl])
-    if code!=0:
+    # validate (in-process; tools/validate_jsonl.py is the same check as a CLI)
+    report=validate_file(args.schema, jsonl)
+    report.write(sys.stdout)
+    if not report.ok:
         open("BLOCKER.md","w",encoding="utf-8").write("Structurer schema validation failed\n")
-        sys.exit(code)
-    print(f"structurer: wrote {jsonl}, {csvp}, summaries, manifest")
+        sys.exit(1)
+    tmp=cachep+".tmp"
+    with open(tmp,"w",encoding="utf-8") as f:
+        json.dump({"version":EXTRACTOR_VERSION,"docs":docs}, f, ensure_ascii=False)
+    os.replace(tmp, cachep)
+    print(f"structurer: wrote {jsonl}, {csvp}, summaries, manifest ({len(todo)} extracted, {len(changed)-len(todo)} reused, {len(dropped)} dropped)")
 
 if __name__=="__main__":
-    main()
+    run_main(main, "structurer")
@@ -1,16 +1,72 @@
 ﻿print("Running run_marketintel_cycle.py...")
-import datetime, csv, os, json
+import argparse, datetime, hashlib, os, json
+from tools.kb_store import CsvKB, open_kb, resolve_kb_path
+
+def mark_digest(kb, position):
+    """Digest of what precedes a high-water mark: the CSV bytes just before it
+    (None unless they end a row) or the columnar row just before it."""
+    if position == 0:
+        return ""
+    if isinstance(kb, CsvKB):
+        with open(kb.path, "rb") as f:
+            f.seek(max(0, position - 4096))
+            tail = f.read(min(position, 4096))
+        return hashlib.sha256(tail).hexdigest() if tail.endswith(b"\n") else None
+    row = next(kb.scan(start=position - 1), None)
+    return hashlib.sha256(json.dumps(row, sort_keys=True).encode("utf-8")).hexdigest() if row else None
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--full", action="store_true",
+                help="rebuild weekly_<date>.md from every KB row (backfill); default is incremental")
+args = ap.parse_args()
 root = os.getcwd()
-kb = os.path.join(root,"02_structured","knowledge_base.csv")
+# columnar store (02_structured/knowledge_base.kb) if present, else the CSV
+kb_path = resolve_kb_path(os.path.join(root,"02_structured","knowledge_base.csv"))
+kb = open_kb(kb_path)
 outdir = os.path.join(root,"03_analysis","weekly_notes")
 os.makedirs(outdir, exist_ok=True)
-ts = datetime.date.today().isoformat()
-out = os.path.join(outdir, f"weekly_{ts}.md")
-with open(kb, newline="", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
-md = [f"# Weekly Notes — Auto summary for {ts}", ""]
-for r in rows:
-    md.append(f"- {r['date']} {r['company']} {r['product']}: {r['headline']}")
-open(out,"w",encoding="utf-8").write("\n".join(md))
-print(f"✅ Created {out}")
+today = datetime.date.today()
+ts = today.isoformat()
+# only the columns the summary renders are read
+columns = ["date","company","product","headline"]
+
+if args.full:
+    out = os.path.join(outdir, f"weekly_{ts}.md")
+    rows = kb.scan(columns=columns)
+    md = [f"# Weekly Notes — Auto summary for {ts}", ""]
+    for r in rows:
+        md.append(f"- {r['date']} {r['company']} {r['product']}: {r['headline']}")
+    open(out,"w",encoding="utf-8").write("\n".join(md))
+    print(f"✅ Created {out}")
+else:
+    # High-water mark: KB position (CSV byte offset / columnar row index) already summarized,
+    # plus a digest of what precedes it so an edited or rewritten KB is noticed.
+    # Rows past it that fall in the current ISO week are appended to that week's notes.
+    state_path = os.path.join(outdir, "weekly_state.json")
+    state = json.load(open(state_path, encoding="utf-8")) if os.path.exists(state_path) else {}
+    kb_rel = os.path.relpath(kb_path, root)
+    year, week, weekday = today.isocalendar()
+    monday = today - datetime.timedelta(days=weekday-1)
+    week_id = f"{year}-W{week:02d}"
+    end = kb.end()
+    start = state.get("position", 0)
+    if (state.get("kb") != kb_rel or state.get("iso_week") != week_id or start > end
+            or state.get("mark") is None or mark_digest(kb, start) != state.get("mark")):
+        start = 0  # different or rewritten KB, or a new week (rows for it may predate the mark): start over
+    out = os.path.join(outdir, f"weekly_{week_id}.md")
+    new = [f"- {r['date']} {r['company']} {r['product']}: {r['headline']}"
+           for r in kb.scan(columns=columns, start=start,
+                            date_from=monday.isoformat(),
+                            date_to=(monday + datetime.timedelta(days=6)).isoformat())]
+    fresh = start == 0 or not os.path.exists(out)
+    with open(out,"w" if fresh else "a",encoding="utf-8") as f:
+        if fresh:
+            f.write(f"# Weekly Notes — Auto summary for {week_id}\n\n")
+        f.writelines(line + "\n" for line in new)
+    state = {"kb": kb_rel, "position": end, "mark": mark_digest(kb, end), "iso_week": week_id,
+             "updated_at": datetime.datetime.utcnow().replace(microsecond=0).isoformat()+"Z"}
+    tmp = state_path + ".tmp"
+    with open(tmp,"w",encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, state_path)
+    print(f"✅ Updated {out} (+{len(new)} rows)")
@@ -1,28 +1,376 @@
-import argparse, json, subprocess, sys, os, datetime
+import argparse, json, subprocess, sys, os, datetime, hashlib, threading, traceback, importlib.util, time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+try:
+    import resource
+except ImportError:  # Windows
+    resource=None
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.profiling import profile_call
 
-def run(cmd):
-    print(">>", " ".join(cmd))
-    return subprocess.call(cmd)
+_modules={}
+_inprocess_lock=threading.Lock()
+_agent_pool=None
+_profiled=set()
+
+def python_script(cmd):
+    """Script path if cmd is `python <script>.py ...`, else None."""
+    if len(cmd)>=2 and os.path.basename(cmd[0]).startswith("python") and cmd[1].endswith(".py"):
+        return cmd[1]
+    return None
+
+def load_main(script):
+    """Import script once (reloaded if it changed on disk) and return its main(), or None.
+
+    The module is registered in sys.modules so functions it hands to its own
+    process pools can be pickled by reference.
+    """
+    path=os.path.abspath(script)
+    key=(path, os.stat(path).st_mtime_ns)
+    if key not in _modules:
+        name="job_"+os.path.splitext(os.path.basename(path))[0]
+        spec=importlib.util.spec_from_file_location(name, path)
+        mod=importlib.util.module_from_spec(spec)
+        sys.modules[name]=mod
+        try:
+            spec.loader.exec_module(mod)
+        except BaseException:
+            del sys.modules[name]; raise
+        _modules[key]=mod
+    return getattr(_modules[key], "main", None)
+
+def run_inprocess(cmd):
+    """Run `python <script>.py args...` as <script>.main() with sys.argv overridden; returns exit code."""
+    script=python_script(cmd)
+    entry=load_main(script)
+    if entry is None:
+        return subprocess.call(cmd)
+    argv=sys.argv
+    sys.argv=[script]+list(cmd[2:])
+    try:
+        entry(); return 0
+    except SystemExit as e:
+        if e.code is None: return 0
+        if isinstance(e.code, int): return e.code
+        print(e.code, file=sys.stderr); return 1
+    except Exception:
+        traceback.print_exc(); return 1
+    finally:
+        sys.argv=argv
+        sys.stdout.flush(); sys.stderr.flush()
+
+IO_FIELDS=("rchar","wchar","read_bytes","write_bytes")
+# how often a running job's VmHWM is sampled
+RSS_SAMPLE_S=0.02
+
+def proc_io(pid="self"):
+    """Byte counters from /proc/<pid>/io (Linux), or {} where unavailable."""
+    try:
+        with open(f"/proc/{pid}/io","r") as f:
+            return {k:int(v) for k,v in (line.split(":") for line in f) if k in IO_FIELDS}
+    except (OSError, ValueError):
+        return {}
+
+def proc_status_kb(pid, field):
+    """A kB field (VmHWM, VmRSS, ...) of /proc/<pid>/status, or None (exited, or not Linux)."""
+    try:
+        with open(f"/proc/{pid}/status","r") as f:
+            for line in f:
+                if line.startswith(field+":"): return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def call_measured(cmd, env=None):
+    """subprocess.call() that also returns the child's CPU time, peak RSS and I/O.
+
+    waitid(WNOWAIT) leaves the exited child unreaped so its /proc io counters
+    can still be read; wait4() then reaps it and returns its rusage.
+    wait4's ru_maxrss also counts the orchestrator pages the child held
+    between fork and exec, so it is only used when it exceeds everything the
+    orchestrator ever held. Otherwise the peak is the child's VmHWM (reset at
+    exec), sampled every RSS_SAMPLE_S while it runs, or None if the job exited
+    before the first sample.
+    """
+    p=subprocess.Popen(cmd, env=env)
+    if resource is None or not hasattr(os,"waitid"):
+        return p.wait(), {}
+    hwm=[]; done=threading.Event()
+    def sample():
+        while True:
+            v=proc_status_kb(p.pid,"VmHWM")
+            if v is not None: hwm.append(v)
+            if done.wait(RSS_SAMPLE_S): return
+    sampler=threading.Thread(target=sample, daemon=True); sampler.start()
+    os.waitid(os.P_PID, p.pid, os.WEXITED|os.WNOWAIT)
+    done.set(); sampler.join()
+    io=proc_io(p.pid)
+    _,status,ru=os.wait4(p.pid,0)
+    p.returncode=os.waitstatus_to_exitcode(status)
+    floor=proc_status_kb("self","VmHWM") or resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peaks=hwm+([ru.ru_maxrss] if ru.ru_maxrss>floor else [])
+    return p.returncode, {"user_s":ru.ru_utime,"sys_s":ru.ru_stime,"max_rss_kb":max(peaks, default=None),**io}
+
+def inprocess_measured(cmd, task=None):
+    """run_inprocess() with CPU and I/O deltas of this process.
+
+    A job's own peak RSS cannot be told apart from the process's, so only
+    process_max_rss_kb (the process peak so far) is reported and max_rss_kb is None.
+
+    With task set, the call is profiled into AUDIT/profiles/<task>/.
+    """
+    call=(lambda: profile_call(lambda: run_inprocess(cmd), task)) if task else (lambda: run_inprocess(cmd))
+    if resource is None:
+        return call(), {}
+    r0,io0=resource.getrusage(resource.RUSAGE_SELF),proc_io()
+    rc=call()
+    r1,io1=resource.getrusage(resource.RUSAGE_SELF),proc_io()
+    return rc, {"user_s":r1.ru_utime-r0.ru_utime,"sys_s":r1.ru_stime-r0.ru_stime,"max_rss_kb":None,"process_max_rss_kb":r1.ru_maxrss,
+                **{k:io1[k]-io0[k] for k in io1 if k in io0}}
+
+def _pool_init(start_method):
+    """Agent pool worker setup: give agents the orchestrator's default start method, not spawn."""
+    multiprocessing.set_start_method(start_method, force=True)
+
+def run(cmd, how="subprocess", task=None):
+    """Execute a job command; returns (exit code, resource metrics incl. the exec mode used).
+
+    subprocess: fresh interpreter per job (full isolation).
+    inprocess:  python agents run inside the orchestrator process, one at a time.
+    pool:       python agents run inside long-lived worker processes that keep
+                their imports across jobs.
+    Commands that are not `python <script>.py` always use a subprocess (see
+    main() for platforms where inprocess/pool are unavailable).
+    Tasks listed in --profile are profiled (see tools/profiling.py).
+    """
+    print(">>", " ".join(cmd), flush=True)
+    prof=task if task in _profiled else None
+    if python_script(cmd) is None: how="subprocess"
+    if how=="subprocess":
+        rc,m=call_measured(cmd, dict(os.environ, CGCE_PROFILE="1", CGCE_PROFILE_TASK=task) if prof else None)
+    elif how=="pool":
+        rc,m=_agent_pool.submit(inprocess_measured, cmd, prof).result()
+    else:
+        with _inprocess_lock:
+            rc,m=inprocess_measured(cmd, prof)
+    return rc, {**m, "exec":how}
+
+def now():
+    return datetime.datetime.utcnow().isoformat()+"Z"
+
+def path_digest(p, mode):
+    """Digest of a file or directory tree: content SHA-256 ("hash") or size+mtime ("stat")."""
+    if not os.path.exists(p): return "MISSING"
+    if os.path.isdir(p):
+        h=hashlib.sha256()
+        for root,dirs,files in os.walk(p):
+            dirs.sort()
+            for fn in sorted(files):
+                fp=os.path.join(root,fn)
+                h.update(f"{os.path.relpath(fp,p)}\0{path_digest(fp,mode)}\n".encode("utf-8"))
+        return h.hexdigest()
+    if mode=="stat":
+        st=os.stat(p); return f"{st.st_size}:{st.st_mtime_ns}"
+    h=hashlib.sha256()
+    with open(p,"rb") as f:
+        for b in iter(lambda:f.read(1<<20), b""): h.update(b)
+    return h.hexdigest()
+
+def fingerprint(j, mode):
+    """Fingerprint of a job's command (and its script, for python jobs) plus the current state of its declared inputs and outputs."""
+    doc={"command":j["command"],
+         "inputs":{p:path_digest(p,mode) for p in j.get("inputs",[])},
+         "outputs":{p:path_digest(p,mode) for p in j.get("outputs",[])}}
+    script=python_script(j["command"])
+    if script: doc["script"]=path_digest(script,mode)
+    return hashlib.sha256(json.dumps(doc,sort_keys=True).encode("utf-8")).hexdigest()
+
+def run_job(j, last_fp, mode, forced, how="subprocess"):
+    """Run one job unless it is up to date; returns (exit code or "SKIP", post-run fingerprint, metrics)."""
+    t0=time.perf_counter()
+    if not forced and last_fp is not None and all(os.path.exists(p) for p in j.get("outputs",[])):
+        if fingerprint(j, mode)==last_fp:
+            print(f"== {j['task']} up to date, skipped")
+            return "SKIP", last_fp, {"wall_s":time.perf_counter()-t0}
+    t0=time.perf_counter()
+    rc,m=run(j["command"], how, j["task"])
+    return rc, (fingerprint(j, mode) if rc==0 else None), {"wall_s":time.perf_counter()-t0,**m}
+
+def metrics_record(j, rc, m):
+    """One metrics line, in the flat shape and status vocabulary (ok/skipped/failed) of
+    codex_engine/analytics/codex_metrics.jsonl; the job's exit code is kept in exit_code and
+    exec is the mode it actually ran in (None if skipped)."""
+    status="skipped" if rc=="SKIP" else "ok" if rc==0 else "failed"
+    rec={"timestamp":now(),"step":j["task"],"agent":j["agent"],"status":status,
+         "exit_code":None if rc=="SKIP" else rc,"exec":m.get("exec")}
+    for k in ("wall_s","user_s","sys_s"):
+        rec[k]=round(m[k],4) if k in m else None
+    for k in ("max_rss_kb",)+IO_FIELDS:
+        rec[k]=m.get(k)
+    if "process_max_rss_kb" in m: rec["process_max_rss_kb"]=m["process_max_rss_kb"]
+    return rec
+
+def summary_table(records):
+    """Fixed-width per-job table; the jobs with the longest wall time and the largest
+    per-job peak RSS are marked as the time and memory bottlenecks.
+
+    Jobs run in-process only have the process-wide peak so far, shown with a
+    '*' and never marked.
+    """
+    mb=lambda v: f"{v/1048576:.1f}" if v is not None else "-"
+    sec=lambda v: f"{v:.2f}" if v is not None else "-"
+    ran=[r for r in records if r["status"]!="skipped"]
+    slow=max(ran, key=lambda r: r["wall_s"], default=None)
+    big=max((r for r in ran if r["max_rss_kb"] is not None), key=lambda r: r["max_rss_kb"], default=None)
+    lines=[f"{'task':<16} {'status':<8} {'wall_s':>8} {'user_s':>8} {'sys_s':>8} {'rss_MB':>8} {'read_MB':>8} {'write_MB':>8}"]
+    shared=False
+    for r in records:
+        if r["max_rss_kb"] is not None:
+            rss=mb(r["max_rss_kb"]*1024)
+        elif r.get("process_max_rss_kb") is not None:
+            rss=mb(r["process_max_rss_kb"]*1024)+"*"; shared=True
+        else:
+            rss="-"
+        marks=(["bottleneck"] if r is slow else [])+(["peak memory"] if r is big else [])
+        lines.append(f"{r['step']:<16} {r['status']:<8} {sec(r['wall_s']):>8} {sec(r['user_s']):>8} {sec(r['sys_s']):>8} "
+                     f"{rss:>8} {mb(r['rchar']):>8} {mb(r['wchar']):>8}" + ("  <- "+", ".join(marks) if marks else ""))
+    if shared:
+        lines.append("* peak RSS of the whole orchestrator/pool process so far, not of the job")
+    return "\n".join(lines)+"\n"
+
+def load_state(p):
+    try:
+        return json.load(open(p,"r",encoding="utf-8"))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_state(p, state):
+    tmp=p+".tmp"
+    with open(tmp,"w",encoding="utf-8") as f: json.dump(state,f,indent=2,sort_keys=True)
+    os.replace(tmp,p)
+
+def overlaps(a, b):
+    """True if paths a and b are the same or one contains the other."""
+    a,b=os.path.normpath(a),os.path.normpath(b)
+    return a==b or a.startswith(b+os.sep) or b.startswith(a+os.sep)
+
+def build_graph(jobs):
+    """task -> set of upstream tasks, from declared inputs/outputs.
+
+    A job depends on every earlier job whose outputs it reads, whose outputs
+    it rewrites, or whose inputs it rewrites, so any order the graph allows
+    gives the same result as running the file top to bottom.
+    """
+    deps={}
+    for n,j in enumerate(jobs):
+        if j["task"] in deps: raise ValueError(f"duplicate task {j['task']}")
+        ins,outs=j.get("inputs",[]),j.get("outputs",[])
+        deps[j["task"]]={k["task"] for k in jobs[:n]
+                         if any(overlaps(o,p) for o in k.get("outputs",[]) for p in ins+outs)
+                         or any(overlaps(i,o) for i in k.get("inputs",[]) for o in outs)}
+    return deps
+
+def downstream(deps, task):
+    """task plus every task that (transitively) depends on it."""
+    out={task}; grew=True
+    while grew:
+        grew=False
+        for t,d in deps.items():
+            if t not in out and d&out: out.add(t); grew=True
+    return out
+
+def execute(jobs, deps, workers, log, state=None, state_path=None, mode="hash", forced=(), how="subprocess", metrics=None):
+    """Run jobs on a bounded pool as their dependencies complete; returns exit code.
+
+    A job whose fingerprint matches the one recorded in state after its last
+    successful run is skipped (unless its task is in forced); state is saved
+    after every completed job. Each finished job's metrics record is appended
+    to the metrics list, if given.
+    """
+    state={} if state is None else state
+    pending={j["task"]:j for j in jobs}
+    order=[j["task"] for j in jobs]
+    running={}; done=set(); code=0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for task in list(pending):
+                if code!=0 or len(running)>=workers: break
+                if not deps[task]<=done: continue
+                missing=any(not os.path.exists(p) for p in pending[task].get("inputs",[]))
+                # undeclared producer may still be pending: wait for every earlier job first
+                if missing and not set(order[:order.index(task)])<=done: continue
+                j=pending.pop(task)
+                log.write(f"[{now()}] START {j['task']} by {j['agent']}\n")
+                if missing:
+                    open("BLOCKER.md","w").write(f"Missing inputs for {j['task']}: {j.get('inputs')}\n")
+                    log.write(f"[{now()}] BLOCKER {j['task']}\n"); print("BLOCKER"); code=1; break
+                last=state.get(task,{}).get("fingerprint")
+                running[pool.submit(run_job, j, last, mode, task in forced, how)]=j
+            log.flush()
+            if not running: break
+            finished,_=wait(running, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                j=running.pop(fut); rc,fp,m=fut.result()
+                status="SKIP" if rc=="SKIP" else "OK" if rc==0 else f"ERR({rc})"
+                log.write(f"[{now()}] END {j['task']} {status} wall={m['wall_s']:.2f}s"
+                          + (f" cpu={m['user_s']+m['sys_s']:.2f}s" if "user_s" in m else "")
+                          + (f" rss={m['max_rss_kb']}KB" if m.get("max_rss_kb") is not None else "") + "\n")
+                if metrics is not None: metrics.append(metrics_record(j, rc, m))
+                if rc=="SKIP": done.add(j["task"])
+                elif rc==0:
+                    done.add(j["task"])
+                    state[j["task"]]={"fingerprint":fp,"at":now()}
+                    if state_path: save_state(state_path, state)
+                elif code==0: code=rc
+    return code
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--jobs", required=True)
+    ap.add_argument("--workers", type=int, default=4, help="max jobs running at once")
+    ap.add_argument("--force", action="store_true", help="rerun every job even if up to date")
+    ap.add_argument("--from", dest="from_task", help="rerun this task and everything downstream of it")
+    ap.add_argument("--fingerprint", choices=["hash","stat"], default="hash",
+                    help="up-to-date check: content SHA-256 or size+mtime of inputs/outputs")
+    ap.add_argument("--profile", default="", metavar="TASK[,TASK]", help="profile these tasks into AUDIT/profiles/<task>/ (\"all\" for every task)")
+    ap.add_argument("--exec", dest="how", choices=["subprocess","inprocess","pool"], default="subprocess",
+                    help="how python agents run: own interpreter, inside the orchestrator, or in persistent workers")
     args=ap.parse_args()
     jobs=json.load(open(args.jobs,"r",encoding="utf-8"))
+    deps=build_graph(jobs)
+    if args.from_task and args.from_task not in deps:
+        ap.error(f"unknown task for --from: {args.from_task}")
+    global _profiled, _agent_pool
+    _profiled=set(deps) if args.profile=="all" else {t for t in args.profile.split(",") if t}
+    if _profiled-set(deps):
+        ap.error(f"unknown task for --profile: {','.join(sorted(_profiled-set(deps)))}")
+    forced=set(deps) if args.force else downstream(deps,args.from_task) if args.from_task else set()
     logp=f"JOBS/{os.path.basename(args.jobs)}.log"
+    statep=f"JOBS/{os.path.basename(args.jobs)}.state.json"
+    metricsp=f"JOBS/{os.path.basename(args.jobs)}.metrics.jsonl"
     os.makedirs("JOBS", exist_ok=True)
-    with open(logp,"a",encoding="utf-8") as log:
-        for j in jobs:
-            ts=datetime.datetime.utcnow().isoformat()+"Z"
-            log.write(f"[{ts}] START {j['task']} by {j['agent']}\n")
-            if any(not os.path.exists(p) for p in j.get("inputs",[])):
-                open("BLOCKER.md","w").write(f"Missing inputs for {j['task']}: {j.get('inputs')}\n")
-                log.write(f"[{ts}] BLOCKER {j['task']}\n"); print("BLOCKER"); sys.exit(1)
-            code = run(j["command"])
-            ts2=datetime.datetime.utcnow().isoformat()+"Z"
-            status="OK" if code==0 else f"ERR({code})"
-            log.write(f"[{ts2}] END {j['task']} {status}\n")
-            if code!=0: sys.exit(code)
+    state=load_state(statep)
+    if state.get("_mode")!=args.fingerprint: state={"_mode":args.fingerprint}
+    if args.how!="subprocess" and multiprocessing.get_start_method()!="fork":
+        # an agent's own worker processes could only import it from a forked orchestrator
+        print(f"job_orchestrator: --exec {args.how} needs the 'fork' start method (default here: "
+              f"{multiprocessing.get_start_method()}); running every job as a subprocess", file=sys.stderr)
+        args.how="subprocess"
+    if args.how=="pool":
+        _agent_pool=ProcessPoolExecutor(max_workers=max(1,args.workers), mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_pool_init, initargs=(multiprocessing.get_start_method(),))
+    records=[]
+    try:
+        with open(logp,"a",encoding="utf-8") as log:
+            code=execute(jobs, deps, max(1,args.workers), log, state, statep, args.fingerprint, forced, args.how, records)
+            if records:
+                table=summary_table(records)
+                log.write(table); print(table, end="")
+    finally:
+        if _agent_pool: _agent_pool.shutdown()
+        with open(metricsp,"a",encoding="utf-8") as f:
+            f.write("".join(json.dumps(r)+"\n" for r in records))
+    if code!=0: sys.exit(code)
     print("jobs complete")
 
 if __name__=="__main__":
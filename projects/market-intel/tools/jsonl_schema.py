@@ -0,0 +1,215 @@
+"""
+Compiled schema checks for signals JSONL.
+
+A schema (02_structured/structurer_schema.json) is compiled once into a
+CompiledSchema; validate_lines() then checks a stream of lines against it and
+collects issues into a Report that caps how many are kept and writes them in
+one buffered call. tools/validate_jsonl.py is the CLI over this module;
+agents call it in-process.
+
+validate_paths() checks many files at once on a process pool; files larger
+than split_bytes are cut at newline boundaries into byte ranges validated
+in parallel, with line numbers rebased when the per-range reports are merged.
+
+Schema keys:
+    fields    allowed field names (others are reported as warnings)
+    required  fields that must be present and, for strings, non-blank
+    types     optional {field: "string"|"number"|"integer"|"boolean"|"array"|"object"|"null"}
+    enum      optional {field: [allowed values]}
+"""
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+TYPES = {
+    "string": (str,),
+    "number": (int, float),
+    "integer": (int,),
+    "boolean": (bool,),
+    "array": (list,),
+    "object": (dict,),
+    "null": (type(None),),
+}
+
+DEFAULT_MAX_ISSUES = 1000
+DEFAULT_SPLIT_BYTES = 64 << 20
+
+
+class CompiledSchema:
+    def __init__(self, schema):
+        self.required = tuple(schema.get("required", []))
+        self.fields = frozenset(schema.get("fields", []))
+        self.types = {}
+        for k, t in schema.get("types", {}).items():
+            if t not in TYPES:
+                raise ValueError(f"unknown type {t!r} for field {k!r}")
+            self.types[k] = (TYPES[t], t)
+        self.enum = {k: frozenset(v) for k, v in schema.get("enum", {}).items()}
+
+    def check(self, obj):
+        """Return (errors, warnings) message lists for one decoded record."""
+        errors = []
+        miss = [k for k in self.required if k not in obj or (isinstance(obj[k], str) and not obj[k].strip())]
+        if miss:
+            errors.append(f"missing required: {','.join(miss)}")
+        for k, (py, name) in self.types.items():
+            if k in obj and (not isinstance(obj[k], py) or (isinstance(obj[k], bool) and bool not in py)):
+                errors.append(f"wrong type: {k} (expected {name})")
+        for k, allowed in self.enum.items():
+            if k in obj and obj[k] not in allowed:
+                errors.append(f"invalid value: {k}={obj[k]!r}")
+        extr = [k for k in obj if k not in self.fields]
+        return errors, ([f"warning extra fields: {','.join(extr)}"] if extr else [])
+
+
+def compile_schema(schema):
+    """Compile a schema dict, or load and compile a schema file path."""
+    if isinstance(schema, CompiledSchema):
+        return schema
+    if not isinstance(schema, dict):
+        with open(schema, "r", encoding="utf-8") as f:
+            schema = json.load(f)
+    return CompiledSchema(schema)
+
+
+class Report:
+    """Validation outcome: counts plus the first max_issues issue lines."""
+
+    def __init__(self, max_issues=DEFAULT_MAX_ISSUES):
+        self.max_issues = max_issues
+        self.lines = 0
+        self.errors = 0
+        self.warnings = 0
+        self.issues = []
+        self.suppressed = 0
+
+    @property
+    def ok(self):
+        return self.errors == 0
+
+    def add(self, line_no, msg, error=True):
+        if error:
+            self.errors += 1
+        else:
+            self.warnings += 1
+        if self.max_issues is None or len(self.issues) < self.max_issues:
+            self.issues.append((line_no, msg))
+        else:
+            self.suppressed += 1
+
+    def merge(self, other, line_offset=0):
+        """Fold in a report for lines that follow this one's (other's L1 is line_offset+1)."""
+        self.lines += other.lines
+        self.errors += other.errors
+        self.warnings += other.warnings
+        self.suppressed += other.suppressed
+        for i, msg in other.issues:
+            if self.max_issues is None or len(self.issues) < self.max_issues:
+                self.issues.append((i + line_offset, msg))
+            else:
+                self.suppressed += 1
+        return self
+
+    def write(self, out, prefix=""):
+        """Write all kept issues to out in one call."""
+        text = "".join(f"{prefix}[L{i}] {msg}\n" for i, msg in self.issues)
+        if self.suppressed:
+            text += f"{prefix}... {self.suppressed} more issues not shown\n"
+        if text:
+            out.write(text)
+
+
+def validate_lines(lines, schema, max_issues=DEFAULT_MAX_ISSUES, report=None, first_line=1):
+    """Check an iterable of JSONL lines; returns a Report."""
+    schema = compile_schema(schema)
+    report = report or Report(max_issues)
+    loads = json.loads
+    check = schema.check
+    n = first_line - 1
+    for n, line in enumerate(lines, first_line):
+        line = line.strip()
+        if not line:
+            report.add(n, "empty line"); continue
+        try:
+            obj = loads(line)
+        except Exception as e:
+            report.add(n, f"invalid json: {e}"); continue
+        if not isinstance(obj, dict):
+            report.add(n, "not a JSON object"); continue
+        errors, warnings = check(obj)
+        for msg in errors:
+            report.add(n, msg)
+        for msg in warnings:
+            report.add(n, msg, error=False)
+    report.lines += n - first_line + 1
+    return report
+
+
+def validate_file(schema, path, max_issues=DEFAULT_MAX_ISSUES):
+    """Check every line of a JSONL file; returns a Report."""
+    with open(path, "r", encoding="utf-8") as f:
+        return validate_lines(f, schema, max_issues)
+
+
+def expand_inputs(patterns):
+    """Resolve files, globs and directories (all *.jsonl below them) to a sorted, de-duplicated file list."""
+    out = []
+    for pat in patterns:
+        if os.path.isdir(pat):
+            out += glob.glob(os.path.join(pat, "**", "*.jsonl"), recursive=True)
+        elif glob.has_magic(pat):
+            out += glob.glob(pat, recursive=True)
+        else:
+            out.append(pat)
+    return sorted(dict.fromkeys(os.path.normpath(p) for p in out))
+
+
+def split_ranges(path, split_bytes):
+    """Cut a file into (start, end) byte ranges of about split_bytes, each ending just after a newline."""
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        while bounds[-1] + split_bytes < size:
+            f.seek(bounds[-1] + split_bytes)
+            f.readline()
+            if f.tell() >= size:
+                break
+            bounds.append(f.tell())
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def validate_range(schema, path, start, end, max_issues=DEFAULT_MAX_ISSUES):
+    """Check the lines in bytes [start, end) of path; line numbers in the Report are range-local."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    lines = data.split(b"\n")
+    if lines and not lines[-1]:
+        lines.pop()
+    return validate_lines((b.decode("utf-8") for b in lines), schema, max_issues)
+
+
+def _validate_task(args):
+    return validate_range(*args)
+
+
+def validate_paths(paths, schema, workers=None, split_bytes=DEFAULT_SPLIT_BYTES, max_issues=DEFAULT_MAX_ISSUES):
+    """Validate many JSONL files (each possibly split into ranges) in parallel.
+
+    Returns {path: Report} in input order, with line numbers relative to each file.
+    """
+    schema = compile_schema(schema)
+    tasks = [(schema, p, a, b, max_issues) for p in paths for a, b in split_ranges(p, split_bytes)]
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        results = [_validate_task(t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_validate_task, tasks))
+    reports = {p: Report(max_issues) for p in paths}
+    for (_, p, _, _, _), part in zip(tasks, results):
+        merged = reports[p]
+        merged.merge(part, line_offset=merged.lines)
+    return reports
@@ -0,0 +1,117 @@
+"""
+Keyed row diffs for CSV and JSONL files.
+
+diff_rows() compares two versions of a table row by row, matching rows on a
+key (e.g. (date, company, product) for the knowledge base, evidence_path for
+signals), and yields added / removed / modified deltas. Memory stays bounded
+on large files by hash partitioning: both sides are streamed once into
+PART_BYTES-sized partitions on disk by a stable hash of the key, and each
+partition pair is then diffed in memory on its own.
+
+tools/diff_summary.py writes these deltas as JSONL (AUDIT/row_delta.jsonl by
+default), one record per changed row:
+
+    {"file": ..., "op": "added",    "key": {...}, "row": {...}}
+    {"file": ..., "op": "removed",  "key": {...}, "old": {...}}
+    {"file": ..., "op": "modified", "key": {...}, "old": {...}, "row": {...}, "changed": [fields]}
+
+If a key occurs more than once in one file, its last row wins.
+"""
+import csv
+import json
+import os
+import tempfile
+import zlib
+
+# table basename -> key columns; extend with diff_summary.py --key name=col,col
+DEFAULT_KEYS = {
+    "knowledge_base.csv": ("date", "company", "product"),
+    "signals.jsonl": ("evidence_path",),
+    "signals.csv": ("evidence_path",),
+}
+PART_BYTES = 64 << 20
+
+
+def is_table(path):
+    return path.endswith((".csv", ".jsonl"))
+
+
+def iter_rows(path):
+    """Stream rows of a .csv (header row required) or .jsonl file as dicts."""
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _keyed(path, keys):
+    for row in iter_rows(path):
+        yield [str(row.get(k, "")) for k in keys], row
+
+
+def _partition(path, keys, parts, tmpdir, tag):
+    """Spread (key, row) pairs of path over `parts` JSONL files by crc32 of the key."""
+    names = [os.path.join(tmpdir, f"{tag}.{i:04d}") for i in range(parts)]
+    files = [open(n, "w", encoding="utf-8") for n in names]
+    try:
+        for key, row in _keyed(path, keys):
+            line = json.dumps([key, row], ensure_ascii=False)
+            files[zlib.crc32("\x1f".join(key).encode("utf-8")) % parts].write(line + "\n")
+    finally:
+        for f in files:
+            f.close()
+    return names
+
+
+def _read_part(name):
+    with open(name, "r", encoding="utf-8") as f:
+        for line in f:
+            key, row = json.loads(line)
+            yield key, row
+
+
+def _diff(old_pairs, new_pairs, keys):
+    """Deltas between two lists of unique (key tuple, row) pairs, sorted by key."""
+    old = dict(old_pairs)
+    out = []
+    seen = set()
+    for k, row in new_pairs:
+        seen.add(k)
+        key = dict(zip(keys, k))
+        if k not in old:
+            out.append((k, {"op": "added", "key": key, "row": row}))
+        elif old[k] != row:
+            changed = sorted(f for f in old[k].keys() | row.keys() if old[k].get(f) != row.get(f))
+            out.append((k, {"op": "modified", "key": key, "old": old[k], "row": row, "changed": changed}))
+    out += [(k, {"op": "removed", "key": dict(zip(keys, k)), "old": r}) for k, r in old.items() if k not in seen]
+    out.sort(key=lambda x: x[0])
+    return [d for _, d in out]
+
+
+def _last_wins(pairs):
+    """Collapse repeated keys to their last row, keeping first-seen order."""
+    rows = {}
+    for k, r in pairs:
+        rows[tuple(k)] = r
+    return list(rows.items())
+
+
+def diff_rows(old_path, new_path, keys, part_bytes=PART_BYTES):
+    """Yield delta dicts (op, key, row/old, changed) between two versions of a table.
+
+    Deltas come out sorted by key within each hash partition.
+    """
+    keys = tuple(keys)
+    parts = max(1, -(-max(os.path.getsize(old_path), os.path.getsize(new_path)) // part_bytes))
+    if parts == 1:
+        yield from _diff(_last_wins(_keyed(old_path, keys)), _last_wins(_keyed(new_path, keys)), keys)
+        return
+    with tempfile.TemporaryDirectory(prefix="row_diff_") as tmp:
+        olds = _partition(old_path, keys, parts, tmp, "old")
+        news = _partition(new_path, keys, parts, tmp, "new")
+        for o, n in zip(olds, news):
+            yield from _diff(_last_wins(_read_part(o)), _last_wins(_read_part(n)), keys)
@@ -0,0 +1,119 @@
+"""
+Random-access reader for JSONL files such as 02_structured/signals.jsonl.
+
+The file is memory-mapped and a line-offset index is built once and cached
+beside it (<file>.idx, keyed by size and mtime), so len() is O(1), row N is
+one slice plus one json.loads, and raw()/raw_slice() hand out zero-copy
+memoryviews. Row i (0-based) is line i+1 of the file, matching the [n]
+citations the analyst writes.
+
+    with SignalsReader("02_structured/signals.jsonl") as sigs:
+        n = len(sigs)
+        row = sigs[41]            # dict for line 42
+        for s in sigs: ...        # streams rows in file order
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+
+INDEX_MAGIC = b"SIGIDX1\0"
+_HEADER = struct.Struct("<8sQQQ")  # magic, file size, file mtime_ns, offset count
+
+
+class SignalsReader:
+    def __init__(self, path, index_path=None, cache_index=True):
+        self.path = path
+        self.index_path = index_path or path + ".idx"
+        self._f = open(path, "rb")
+        st = os.fstat(self._f.fileno())
+        self._size, self._mtime = st.st_size, st.st_mtime_ns
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        self._view = memoryview(self._mm) if self._mm else memoryview(b"")
+        self.offsets = self._load_index()
+        if self.offsets is None:
+            self.offsets = self._build_index()
+            if cache_index:
+                self._save_index()
+
+    # -- index ------------------------------------------------------------
+
+    def _build_index(self):
+        offs = array("Q", [0])
+        if self._mm is None:
+            return offs
+        find, pos = self._mm.find, 0
+        while True:
+            j = find(b"\n", pos)
+            if j < 0:
+                break
+            pos = j + 1
+            offs.append(pos)
+        if offs[-1] != self._size:
+            offs.append(self._size)
+        return offs
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, size, mtime, count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != INDEX_MAGIC or size != self._size or mtime != self._mtime:
+                    return None
+                offs = array("Q")
+                offs.fromfile(f, count)
+                return offs
+        except (OSError, EOFError, struct.error):
+            return None
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, self._size, self._mtime, len(self.offsets)))
+                self.offsets.tofile(f)
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass  # read-only location: the index is only a cache
+
+    # -- access -----------------------------------------------------------
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def raw(self, i):
+        """Zero-copy bytes of row i, without the line terminator."""
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(f"row {i} out of range (0..{len(self) - 1})")
+        a, b = self.offsets[i], self.offsets[i + 1]
+        while b > a and self._view[b - 1] in (10, 13):
+            b -= 1
+        return self._view[a:b]
+
+    def raw_slice(self, start, stop):
+        """Zero-copy bytes of rows [start, stop) including their newlines."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        return self._view[self.offsets[start]:self.offsets[max(start, stop)]]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return json.loads(bytes(self.raw(i)))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def close(self):
+        self._view.release()
+        if self._mm:
+            self._mm.close()
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
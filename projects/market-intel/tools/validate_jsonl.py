@@ -1,31 +1,32 @@
-import argparse, json, sys
+import argparse, os, sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.jsonl_schema import DEFAULT_MAX_ISSUES, DEFAULT_SPLIT_BYTES, expand_inputs, validate_paths
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--schema", required=True)
-    ap.add_argument("--input", required=True)
+    ap.add_argument("--input", required=True, nargs="+", help="JSONL files, globs or directories (all *.jsonl below)")
+    ap.add_argument("--max-issues", type=int, default=DEFAULT_MAX_ISSUES, help="issue lines printed per file before the rest are only counted")
+    ap.add_argument("--workers", type=int, default=None, help="validation processes (default: CPU count)")
+    ap.add_argument("--split-bytes", type=int, default=DEFAULT_SPLIT_BYTES, help="files larger than this are validated in parallel byte ranges")
     args = ap.parse_args()
-
-    schema = json.load(open(args.schema, "r", encoding="utf-8"))
-    required = set(schema.get("required", []))
-    fields = set(schema.get("fields", []))
-    ok = True
-    with open(args.input, "r", encoding="utf-8") as f:
-        for i, line in enumerate(f, 1):
-            line = line.strip()
-            if not line: 
-                print(f"[L{i}] empty line"); ok=False; continue
-            try:
-                obj = json.loads(line)
-            except Exception as e:
-                print(f"[L{i}] invalid json: {e}"); ok=False; continue
-            miss = [k for k in required if k not in obj or (isinstance(obj[k], str) and not obj[k].strip())]
-            extr = [k for k in obj.keys() if k not in fields]
-            if miss:
-                print(f"[L{i}] missing required: {','.join(miss)}"); ok=False
-            if extr:
-                print(f"[L{i}] warning extra fields: {','.join(extr)}")
-    sys.exit(0 if ok else 1)
+    paths = expand_inputs(args.input)
+    if not paths:
+        print(f"no input files match: {' '.join(args.input)}"); sys.exit(1)
+    reports = validate_paths(paths, args.schema, args.workers, args.split_bytes, args.max_issues)
+    if len(paths) == 1:
+        report = reports[paths[0]]
+        report.write(sys.stdout)
+        sys.exit(0 if report.ok else 1)
+    out = []
+    for p, r in reports.items():
+        out.append(f"== {p}: {r.lines} lines, {r.errors} errors, {r.warnings} warnings\n")
+    sys.stdout.write("".join(out))
+    for p, r in reports.items():
+        r.write(sys.stdout, prefix=f"{p}:")
+    total = lambda k: sum(getattr(r, k) for r in reports.values())
+    print(f"validated {len(paths)} files: {total('lines')} lines, {total('errors')} errors, {total('warnings')} warnings")
+    sys.exit(0 if all(r.ok for r in reports.values()) else 1)
 
 if __name__ == "__main__":
     main()
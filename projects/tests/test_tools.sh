@@ -0,0 +1,364 @@
+#!/usr/bin/env bash
+# Checks for the shared tools (run from the project root, like test_pipeline.sh).
+set -euo pipefail
+ROOT="$(pwd)"
+TMP="$(mktemp -d)"
+trap 'rm -rf "$TMP"' EXIT
+export PYTHONPATH="$ROOT" TMP
+
+echo "[1] kb_store: CSV -> columnar -> CSV round trip"
+python tools/kb_store.py import 02_structured/knowledge_base.csv "$TMP/kb.kb" >/dev/null
+python tools/kb_store.py export "$TMP/kb.kb" "$TMP/kb.csv" >/dev/null
+python - <<'EOF'
+import csv, os
+tmp = os.environ["TMP"]
+read = lambda p: list(csv.DictReader(open(p, encoding="utf-8-sig", newline="")))
+assert read("02_structured/knowledge_base.csv") == read(f"{tmp}/kb.csv"), "round trip changed rows"
+EOF
+
+echo "[2] kb_store: scan filters and resume on both backends"
+python - <<'EOF'
+import os
+from tools.kb_store import CsvKB, ColumnarKB
+tmp = os.environ["TMP"]
+rows = [{"date": f"2025-01-{d:02d}", "company": c, "product": f"P{d}", "region": r}
+        for d, c, r in [(1, "A", "EU"), (5, "B", "NA"), (9, "A", "NA"), (12, "C", "EU"), (20, "A", "EU")]]
+for kb in (CsvKB(f"{tmp}/scan.csv"), ColumnarKB(f"{tmp}/scan.kb")):
+    name = type(kb).__name__
+    kb.append(rows[:3])
+    mark = kb.end()
+    kb.append(rows[3:])
+    got = lambda **kw: [r["product"] for r in kb.scan(**kw)]
+    assert got() == ["P1", "P5", "P9", "P12", "P20"], name
+    assert got(date_from="2025-01-05", date_to="2025-01-12") == ["P5", "P9", "P12"], name
+    assert got(where={"company": "A"}) == ["P1", "P9", "P20"], name
+    assert got(where={"company": "A", "region": {"EU"}}, date_from="2025-01-02") == ["P20"], name
+    assert got(start=mark) == ["P12", "P20"], name
+    assert list(kb.scan(columns=["company"], start=mark)) == [{"company": "C"}, {"company": "A"}], name
+EOF
+
+echo "[3] kb_store: columnar append recovers from a torn write"
+python - <<'EOF'
+import os
+from tools.kb_store import ColumnarKB
+tmp = os.environ["TMP"]
+kb = ColumnarKB(f"{tmp}/torn.kb")
+kb.append([{"date": "2025-02-01", "company": "A", "product": "X", "source": "s1"}])
+# an append that died after writing column bytes but before its manifest update
+for name in os.listdir(kb.path):
+    if name.endswith((".codes", ".data", ".offsets", ".dict")):
+        with open(os.path.join(kb.path, name), "ab") as f:
+            f.write(b"\x01garbage")
+kb = ColumnarKB(f"{tmp}/torn.kb")
+assert [r["product"] for r in kb.scan()] == ["X"]
+kb.append([{"date": "2025-02-02", "company": "B", "product": "Y", "source": "s2"}])
+kb = ColumnarKB(f"{tmp}/torn.kb")
+assert [(r["company"], r["product"], r["source"]) for r in kb.scan()] == [("A", "X", "s1"), ("B", "Y", "s2")]
+EOF
+
+echo "[4] analyst: --page_bytes splits findings over 3+ pages with an index"
+python - <<'EOF'
+import os, re, sys
+sys.path.insert(0, "bench")
+from gen_corpus import generate
+tmp = os.environ["TMP"]
+generate(f"{tmp}/corpus", 1000, docs=0)
+EOF
+mkdir -p "$TMP/analysis"
+python agents/analyst.py --signals "$TMP/corpus/signals.jsonl" --outdir "$TMP/analysis" --page_bytes 20000 >/dev/null
+python - <<'EOF'
+import glob, os, re
+out = os.path.join(os.environ["TMP"], "analysis")
+pages = sorted(glob.glob(f"{out}/findings_[0-9]*.md"))
+assert len(pages) >= 3, pages
+index = open(f"{out}/findings.md", encoding="utf-8").read()
+ranges = [(name, int(a), int(b)) for name, a, b in re.findall(r"- (findings_\d{4}\.md): \[(\d+)\]–\[(\d+)\]", index)]
+assert [n for n, _, _ in ranges] == [os.path.basename(p) for p in pages], index
+assert ranges[0][1] == 1 and all(b + 1 == a2 for (_, _, b), (_, a2, _) in zip(ranges, ranges[1:])), ranges
+for page, (_, a, b) in zip(pages, ranges):
+    assert sum(1 for line in open(page, encoding="utf-8") if line.startswith("- ")) == b - a + 1, page
+EOF
+
+echo "[5] ingest_scanner_bullets: streaming parser"
+python - <<'EOF'
+import io, json
+from ingest_scanner_bullets import iter_stream_bullets
+
+class Reader(io.StringIO):
+    reads = 0
+    def read(self, n=-1):
+        self.reads += 1
+        return super().read(n)
+
+parse = lambda text, **kw: list(iter_stream_bullets(io.StringIO(text), chunk_size=3, **kw))
+rows = [{"a": 1}, {"b": [2, 3]}]
+assert parse('[{"a": 1}, {"b": [2, 3]}]') == rows
+assert parse('{"a": 1}\n{"b": [2, 3]}\n') == rows
+assert parse('{"a": 1} {"b": [2, 3]}') == rows
+assert parse(' [ ] ') == []
+for text in ['[,,{"a": 1},,]', '[{} {}]', '[{},]', '[{}', '[{}] x', '{} ,{}']:
+    try:
+        parse(text)
+    except json.JSONDecodeError:
+        continue
+    raise AssertionError(f"accepted {text!r}")
+# a malformed record stops the parser once max_record is buffered, not at EOF
+f = Reader('{"a": "oops\n' + '{"b": 1}\n' * 100000)
+try:
+    list(iter_stream_bullets(f, chunk_size=64, max_record=1024))
+except json.JSONDecodeError:
+    pass
+else:
+    raise AssertionError("malformed record accepted")
+assert f.reads < 100, f.reads
+EOF
+
+echo "[6] job_orchestrator: dependency graph and up-to-date skips"
+python - <<'EOF'
+from tools.job_orchestrator import build_graph, downstream
+job = lambda t, i, o: {"task": t, "inputs": i, "outputs": o, "command": ["true"]}
+deps = build_graph([job("scan", ["fixtures"], ["raw"]),
+                    job("struct", ["raw/index.md"], ["kb.csv"]),   # reads scan's output
+                    job("report", ["kb.csv"], ["report.md"]),
+                    job("rescan", [], ["fixtures/extra"]),         # rewrites scan's input
+                    job("restruct", [], ["kb.csv"])])              # rewrites struct's output
+assert deps == {"scan": set(), "struct": {"scan"}, "report": {"struct"},
+                "rescan": {"scan"}, "restruct": {"struct", "report"}}, deps
+assert downstream(deps, "struct") == {"struct", "report", "restruct"}
+EOF
+mkdir -p "$TMP/dag/JOBS"
+printf 'import shutil\nshutil.copy("in.txt", "mid.txt")\n' > "$TMP/dag/a.py"
+printf 'import shutil\nshutil.copy("mid.txt", "out.txt")\n' > "$TMP/dag/b.py"
+echo 1 > "$TMP/dag/in.txt"
+cat > "$TMP/dag/JOBS/t.jobs.json" <<'EOF'
+[{"task": "a", "agent": "a", "inputs": ["in.txt"], "outputs": ["mid.txt"], "command": ["python", "a.py"]},
+ {"task": "b", "agent": "b", "inputs": ["mid.txt"], "outputs": ["out.txt"], "command": ["python", "b.py"]}]
+EOF
+orch() { (cd "$TMP/dag" && python "$ROOT/tools/job_orchestrator.py" --jobs JOBS/t.jobs.json "$@"); }
+skipped() { grep -c "up to date, skipped" || true; }
+[ "$(orch | skipped)" = 0 ]
+[ "$(orch | skipped)" = 2 ]
+echo "# edited" >> "$TMP/dag/b.py"      # a changed script reruns its job
+out="$(orch)"
+[ "$(echo "$out" | skipped)" = 1 ]
+echo "$out" | grep -q "^== a up to date"
+echo 2 > "$TMP/dag/in.txt"              # a changed input reruns the job and its dependents
+[ "$(orch | skipped)" = 0 ]
+grep -qx 2 "$TMP/dag/out.txt"
+[ "$(orch --from b | skipped)" = 1 ]
+python - <<'EOF'
+import json, os
+recs = [json.loads(l) for l in open(os.path.join(os.environ["TMP"], "dag/JOBS/t.jobs.json.metrics.jsonl"))]
+assert {(r["status"], r["exit_code"], r["exec"]) for r in recs} == {("ok", 0, "subprocess"), ("skipped", None, None)}, recs
+EOF
+
+echo "[7] job_orchestrator: in-process agents can use their own process pools"
+cat > "$TMP/dag/pooled.py" <<'EOF'
+from concurrent.futures import ProcessPoolExecutor
+def square(x):
+    return x * x
+def main():
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        open("squares.txt", "w").write(" ".join(map(str, pool.map(square, range(4)))))
+EOF
+echo '[{"task": "pooled", "agent": "pooled", "outputs": ["squares.txt"], "command": ["python", "pooled.py"]}]' > "$TMP/dag/JOBS/p.jobs.json"
+for how in inprocess pool; do
+    rm -f "$TMP/dag/squares.txt"
+    (cd "$TMP/dag" && python "$ROOT/tools/job_orchestrator.py" --jobs JOBS/p.jobs.json --exec "$how" --force >/dev/null)
+    grep -qx "0 1 4 9" "$TMP/dag/squares.txt"
+    tail -1 "$TMP/dag/JOBS/p.jobs.json.metrics.jsonl" | grep -q "\"exec\": \"$how\""
+done
+
+echo "[8] row_diff: keyed deltas, including a CSV with a UTF-8 BOM"
+python - <<'EOF'
+import os
+from tools.row_diff import diff_rows
+tmp = os.environ["TMP"]
+head = "date,company,product,region\n"
+with open(f"{tmp}/old.csv", "w", encoding="utf-8-sig") as f:
+    f.write(head + "2025-01-01,A,X,EU\n2025-01-02,B,Y,NA\n2025-01-03,C,Z,EU\n")
+with open(f"{tmp}/new.csv", "w", encoding="utf-8-sig") as f:
+    f.write(head + "2025-01-01,A,X,EU\n2025-01-02,B,Y,APAC\n2025-01-04,D,W,NA\n")
+keys = ("date", "company", "product")
+for part_bytes in (1 << 20, 16):  # in memory and partitioned on disk
+    got = sorted((d["op"], d["key"]["date"], d.get("changed")) for d in diff_rows(f"{tmp}/old.csv", f"{tmp}/new.csv", keys, part_bytes))
+    assert got == [("added", "2025-01-04", None), ("modified", "2025-01-02", ["region"]),
+                   ("removed", "2025-01-03", None)], (part_bytes, got)
+EOF
+
+echo "[9] structurer: --dedup reuses rows of already-seen content instead of extracting it"
+mkdir -p "$TMP/raw" "$TMP/st"
+printf 'Acme ships a sorter.\nAcme signed a retrofit deal. More text.\n' > "$TMP/raw/a.raw.md"
+cp "$TMP/raw/a.raw.md" "$TMP/raw/b.raw.md"
+printf 'Beta opens a hub.\nBeta expands in Europe.\n' > "$TMP/raw/c.raw.md"
+st() { python agents/structurer.py --inputs "$TMP/raw/*.raw.md" --outdir "$TMP/st" --dedup | tail -1; }
+st | grep -q "(2 extracted, 1 reused, 0 dropped)"
+cp "$TMP/raw/c.raw.md" "$TMP/raw/d.raw.md"
+st | grep -q "(0 extracted, 1 reused, 0 dropped)"
+rm "$TMP/raw/a.raw.md"     # b is now the first copy and is emitted from its cached row
+st | grep -q "(0 extracted, 0 reused, 1 dropped)"
+python - <<'EOF'
+import json, os
+st = os.path.join(os.environ["TMP"], "st")
+rows = [json.loads(l) for l in open(f"{st}/signals.jsonl", encoding="utf-8")]
+assert [(os.path.basename(r["evidence_path"]), r["entity"]) for r in rows] == [("b.raw.md", "Acme"), ("c.raw.md", "Beta")], rows
+EOF
+
+echo "[10] job_orchestrator: an upstream change re-runs the auditor"
+W="$TMP/cycle"
+mkdir -p "$W/JOBS" "$W/02_structured" "$W/04_comparisons" "$W/tests/fixtures"
+ln -s "$ROOT/agents" "$ROOT/tools" "$ROOT/00_instructions" "$W/"
+cp 02_structured/structurer_schema.json "$W/02_structured/"
+cp 04_comparisons/comparison_criteria.json "$W/04_comparisons/"
+cp JOBS/2025W45.jobs.json "$W/JOBS/"
+cp -r tests/fixtures/01_raw_scans_sample "$W/tests/fixtures/"
+cycle() { (cd "$W" && python tools/job_orchestrator.py --jobs JOBS/2025W45.jobs.json); }
+cycle >/dev/null
+cycle >/dev/null   # settle: the cleaner's *_cleaned.md files are auditor inputs too
+issues() { grep -c "^- " "$W/AUDIT/audit_report.md" || true; }
+before="$(issues)"
+printf 'NewCo pilots a sorter\nPilot size UNKNOWN. Source: fixture.\n' > "$W/tests/fixtures/01_raw_scans_sample/202502_press_note_newco.raw.md"
+out="$(cycle)"
+if echo "$out" | grep -q "== auditor up to date"; then echo "auditor skipped after upstream change"; exit 1; fi
+[ "$(issues)" -gt "$before" ]
+
+echo "[11] kb_store: repeated appends keep dictionary codes consistent without rereading dictionaries"
+python - <<'EOF'
+import builtins, os
+import tools.kb_store as kb_store
+from tools.kb_store import ColumnarKB
+tmp = os.environ["TMP"]
+reads = []
+def spy(path, mode="r", *a, **kw):
+    if str(path).endswith(".dict") and "r" in mode:
+        reads.append(os.path.basename(path))
+    return builtins.open(path, mode, *a, **kw)
+kb_store.open = spy
+row = lambda i: {"date": f"2025-03-{1 + i % 28:02d}", "company": "ABC"[i % 3], "product": f"P{i}", "customer": f"C{i}"}
+kb = ColumnarKB(f"{tmp}/append.kb")
+kb.append([row(i) for i in range(0, 50)])
+kinds = {c["name"]: c["kind"] for c in kb.manifest["columns"]}
+assert kinds["product"] == kinds["customer"] == "text" and kinds["company"] == "dict", kinds
+kb.append([row(i) for i in range(50, 100)])
+assert reads == [], reads                    # the instance's own appends are never reread
+kb = ColumnarKB(f"{tmp}/append.kb")          # a fresh instance loads each dictionary once
+kb.append([row(i) for i in range(100, 110)])
+kb.append([row(i) for i in range(110, 120)])
+assert sorted(reads) == ["company.dict", "date.dict"], reads
+kb = ColumnarKB(f"{tmp}/append.kb")
+assert list(kb.scan()) == [row(i) for i in range(120)]
+assert kb.manifest["columns"][1]["dict_size"] == 3
+EOF
+
+echo "[12] diff_summary: symlinked directories are not followed"
+mkdir -p "$TMP/ds/old/sub" "$TMP/ds/new/sub"
+echo a > "$TMP/ds/old/sub/a.txt"; echo b > "$TMP/ds/new/sub/a.txt"
+ln -s .. "$TMP/ds/new/sub/loop"
+python tools/diff_summary.py --old "$TMP/ds/old" --new "$TMP/ds/new" --out "$TMP/ds/summary.md" >/dev/null
+grep -q "sub/a.txt" "$TMP/ds/summary.md"
+if grep -q "loop" "$TMP/ds/summary.md"; then echo "followed a directory symlink"; exit 1; fi
+
+echo "[13] job_orchestrator: per-job peak RSS"
+printf 'x = bytearray(64 << 20)\nfor i in range(0, len(x), 4096): x[i] = 1\nimport time; time.sleep(0.1)\n' > "$TMP/dag/hog.py"
+cat > "$TMP/dag/JOBS/m.jobs.json" <<'EOF'
+[{"task": "hog", "agent": "hog", "outputs": [], "command": ["python", "hog.py"]},
+ {"task": "nap", "agent": "sh", "outputs": [], "command": ["sleep", "0.2"]}]
+EOF
+for how in subprocess inprocess; do
+    (cd "$TMP/dag" && python "$ROOT/tools/job_orchestrator.py" --jobs JOBS/m.jobs.json --exec "$how" --force --workers 1 >/dev/null)
+done
+python - <<'EOF'
+import json, os
+recs = [json.loads(l) for l in open(os.path.join(os.environ["TMP"], "dag/JOBS/m.jobs.json.metrics.jsonl"))]
+rss = {(r["exec"], r["step"]): (r["max_rss_kb"], r.get("process_max_rss_kb")) for r in recs}
+assert rss[("subprocess", "hog")][0] > 64 << 10, rss
+assert rss[("subprocess", "nap")][0] < 16 << 10, rss          # not the orchestrator's inherited pages
+assert rss[("inprocess", "hog")][0] is None and rss[("inprocess", "hog")][1] > 64 << 10, rss
+EOF
+
+echo "[14] ingest_scanner_bullets: KeyIndex rebuilds when stale and drops uncommitted keys"
+python - <<'EOF'
+import os
+from pathlib import Path
+from ingest_scanner_bullets import KeyIndex
+from tools.kb_store import CsvKB
+tmp = Path(os.environ["TMP"])
+kb = CsvKB(tmp / "keys.csv")
+kb.append([{"date": "2025-04-01", "company": "A", "product": "X"}])
+idx = KeyIndex(kb.path)
+assert ("2025-04-01", "A", "X") in idx
+idx.close()
+kb.append([{"date": "2025-04-02", "company": "B", "product": "Y"}])   # written behind the index's back
+idx = KeyIndex(kb.path)
+assert ("2025-04-02", "B", "Y") in idx, "stale index not rebuilt"
+idx.add(("2025-04-03", "C", "Z"))                                      # staged, never synced: an interrupted ingest
+idx.close()
+idx = KeyIndex(kb.path)
+assert ("2025-04-03", "C", "Z") not in idx and ("2025-04-02", "B", "Y") in idx
+rebuilt = []
+KeyIndex.rebuild = lambda self: rebuilt.append(self)                   # an up-to-date index is reused as is
+KeyIndex(kb.path).close()
+assert not rebuilt
+EOF
+
+echo "[15] run_marketintel_cycle: weekly high-water mark"
+mkdir -p "$TMP/weekly/02_structured"
+python - >/dev/null <<'EOF'
+import datetime, os, runpy, sys, types
+root = os.getcwd()
+os.chdir(os.path.join(os.environ["TMP"], "weekly"))
+kb = "02_structured/knowledge_base.csv"
+HEAD = "date,company,product,headline\n"
+
+def cycle(today):
+    """Run the weekly cycle as if it were `today`; returns (notes file, its rows)."""
+    class Date(datetime.date):
+        @classmethod
+        def today(cls):
+            return cls.fromisoformat(today)
+    shim = types.ModuleType("datetime")
+    shim.__dict__.update(datetime.__dict__)
+    shim.date = Date
+    sys.modules["datetime"], sys.argv = shim, ["run_marketintel_cycle.py"]
+    try:
+        runpy.run_path(os.path.join(root, "market-intel", "run_marketintel_cycle.py"), run_name="__main__")
+    finally:
+        sys.modules["datetime"] = datetime
+    y, w, _ = Date.fromisoformat(today).isocalendar()
+    out = f"03_analysis/weekly_notes/weekly_{y}-W{w:02d}.md"
+    return out, [l.split(": ")[1].strip() for l in open(out, encoding="utf-8") if l.startswith("- ")]
+
+open(kb, "w", encoding="utf-8").write(HEAD + "2025-11-03,A,P,old\n2025-11-11,A,P,h1\n2025-11-17,C,P,next-week\n")
+out, rows = cycle("2025-11-12")
+assert rows == ["h1"], rows
+open(out, "a", encoding="utf-8").write("- x: kept\n")              # survives only if the next run resumes
+open(kb, "a", encoding="utf-8").write("2025-11-12,B,P,h2\n")
+assert cycle("2025-11-13")[1] == ["h1", "kept", "h2"]               # resumed: only the appended row was added
+open(kb, "w", encoding="utf-8").write(HEAD + "2025-11-11,A,P,h1-edited\n2025-11-12,B,P,h2\n2025-11-13,D,P,h3\n")
+assert cycle("2025-11-13")[1] == ["h1-edited", "h2", "h3"]          # rewritten KB: rebuilt, not resumed mid-file
+open(kb, "w", encoding="utf-8").write(HEAD + "2025-11-11,A,P,h1\n2025-11-17,C,P,next-week\n")
+cycle("2025-11-13")
+out, rows = cycle("2025-11-18")                                       # new ISO week: rows before the mark count
+assert out.endswith("weekly_2025-W47.md") and rows == ["next-week"], rows
+EOF
+
+echo "[16] jsonl_schema: split validation reports file line numbers"
+python - <<'EOF'
+import json, os
+from tools.jsonl_schema import split_ranges, validate_file, validate_paths
+tmp = os.environ["TMP"]
+schema = "02_structured/structurer_schema.json"
+good = open(f"{tmp}/corpus/signals.jsonl", encoding="utf-8").readline()
+lines = [good] * 200
+lines[6], lines[99], lines[149], lines[198] = "{broken\n", "\n", '["not", "an", "object"]\n', json.dumps({"entity": "X"}) + "\n"
+with open(f"{tmp}/split.jsonl", "w", encoding="utf-8") as f:
+    f.writelines(lines)
+whole = validate_file(schema, f"{tmp}/split.jsonl", max_issues=None)
+assert [i for i, _ in whole.issues][:3] == [7, 100, 150] and whole.lines == 200, whole.issues
+for split_bytes, workers in ((1 << 20, 1), (4096, 1), (4096, 2)):
+    assert (len(split_ranges(f"{tmp}/split.jsonl", split_bytes)) > 1) == (split_bytes == 4096)
+    got = validate_paths([f"{tmp}/split.jsonl"], schema, workers, split_bytes, max_issues=None)[f"{tmp}/split.jsonl"]
+    assert (got.issues, got.lines, got.errors) == (whole.issues, whole.lines, whole.errors), (split_bytes, got.issues)
+EOF
+
+echo "PASS"
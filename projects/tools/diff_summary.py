@@ -1,42 +1,109 @@
-import argparse, os, hashlib
+import argparse, os, sys, hashlib, json
+from concurrent.futures import ThreadPoolExecutor
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.row_diff import DEFAULT_KEYS, PART_BYTES, diff_rows, is_table
+
+# per-tree hash cache written by --hash_cache; never listed as part of the tree
+HASH_CACHE=".diff_summary_hashes.json"
 
 def sha256p(p):
     h=hashlib.sha256()
     with open(p,'rb') as f:
-        for b in iter(lambda:f.read(65536), b''): h.update(b)
+        for b in iter(lambda:f.read(1<<20), b''): h.update(b)
     return h.hexdigest()
 
 def walk(d):
-    out=[]
-    for root,_,files in os.walk(d):
-        for fn in files:
-            out.append(os.path.relpath(os.path.join(root,fn), d))
-    return set(out)
+    """rel path -> (size, mtime_ns) for every file under d, using the stat data scandir already has."""
+    out={}
+    stack=[d]
+    while stack:
+        top=stack.pop()
+        with os.scandir(top) as it:
+            for e in it:
+                if e.is_dir(follow_symlinks=False):  # like os.walk: symlinked dirs are not entered
+                    stack.append(e.path)
+                elif e.is_file() and not (top==d and e.name==HASH_CACHE):
+                    st=e.stat()
+                    out[os.path.relpath(e.path, d)]=(st.st_size, st.st_mtime_ns)
+    return out
+
+def load_hashes(d):
+    try:
+        return json.load(open(os.path.join(d,HASH_CACHE),'r',encoding='utf-8')).get("files",{})
+    except (OSError, ValueError):
+        return {}
+
+def save_hashes(d, files):
+    p=os.path.join(d,HASH_CACHE); tmp=p+".tmp"
+    try:
+        with open(tmp,'w',encoding='utf-8') as f: json.dump({"files":files},f)
+        os.replace(tmp,p)
+    except OSError:
+        pass  # read-only snapshot: the cache is optional
 
 def main():
     ap=argparse.ArgumentParser()
     ap.add_argument("--old", required=True)
     ap.add_argument("--new", required=True)
     ap.add_argument("--out", default="AUDIT/diff_summary.md")
+    ap.add_argument("--trust_mtime", action="store_true", help="treat files with equal size and mtime as unchanged without hashing")
+    ap.add_argument("--workers", type=int, default=8, help="files hashed concurrently")
+    ap.add_argument("--hash_cache", action="store_true", help=f"reuse and update per-tree {HASH_CACHE} (keyed by size+mtime)")
+    ap.add_argument("--key", action="append", default=[], metavar="NAME=COL[,COL]",
+                    help="key columns for row diffs of CSV/JSONL files with this basename (adds to the built-in keys)")
+    ap.add_argument("--row_delta", default=None, help="row-level delta JSONL for changed keyed tables (default: row_delta.jsonl next to --out)")
+    ap.add_argument("--no_rows", action="store_true", help="skip row-level diffs")
+    ap.add_argument("--part_bytes", type=int, default=PART_BYTES, help="tables larger than this are diffed in hash partitions of about this size")
     a=ap.parse_args()
     old,new=a.old,a.new
-    oldset, newset = walk(old), walk(new)
-    added = sorted(newset-oldset)
-    removed = sorted(oldset-newset)
-    common = sorted(newset&oldset)
-    changed=[]
-    for rel in common:
-        po, pn = os.path.join(old,rel), os.path.join(new,rel)
-        if os.path.isfile(po) and os.path.isfile(pn):
-            if sha256p(po)!=sha256p(pn):
-                changed.append(rel)
+    oldst, newst = walk(old), walk(new)
+    added = sorted(newst.keys()-oldst.keys())
+    removed = sorted(oldst.keys()-newst.keys())
+    common = sorted(newst.keys()&oldst.keys())
+    # size mismatch proves a change; equal size (and mtime, if trusted) still needs hashes
+    changed={rel for rel in common if oldst[rel][0]!=newst[rel][0]}
+    tohash=[rel for rel in common if rel not in changed and not (a.trust_mtime and oldst[rel]==newst[rel])]
+    caches={d:(load_hashes(d) if a.hash_cache else {}) for d in (old,new)}
+    def digest(d, rel, st):
+        hit=caches[d].get(rel)
+        if hit and tuple(hit[:2])==st: return hit[2]
+        h=sha256p(os.path.join(d,rel))
+        caches[d][rel]=[st[0],st[1],h]
+        return h
+    jobs=[(d,rel,sts[rel]) for rel in tohash for d,sts in ((old,oldst),(new,newst))]
+    with ThreadPoolExecutor(max_workers=max(1,a.workers)) as pool:
+        hashes=list(pool.map(lambda j: digest(*j), jobs))
+    changed.update(rel for rel,ho,hn in zip(tohash, hashes[0::2], hashes[1::2]) if ho!=hn)
+    changed=sorted(changed)
+    if a.hash_cache:
+        for d,sts in ((old,oldst),(new,newst)):
+            save_hashes(d, {rel:v for rel,v in caches[d].items() if rel in sts})
     os.makedirs(os.path.dirname(a.out), exist_ok=True)
+    counts={}
+    if not a.no_rows:
+        keys=dict(DEFAULT_KEYS)
+        for spec in a.key:
+            name,_,cols=spec.partition("=")
+            if not cols: ap.error(f"--key expects NAME=COL[,COL], got {spec!r}")
+            keys[name]=tuple(cols.split(","))
+        deltap=a.row_delta or os.path.join(os.path.dirname(a.out),"row_delta.jsonl")
+        with open(deltap,'w',encoding='utf-8') as f:
+            for rel in changed:
+                cols=keys.get(os.path.basename(rel))
+                if not (cols and is_table(rel)): continue
+                n=counts[rel]={"added":0,"removed":0,"modified":0}
+                for d in diff_rows(os.path.join(old,rel), os.path.join(new,rel), cols, a.part_bytes):
+                    n[d["op"]]+=1
+                    f.write(json.dumps({"file":rel,**d},ensure_ascii=False)+"\n")
+    def label(rel):
+        n=counts.get(rel)
+        return f"{rel} (rows: +{n['added']} -{n['removed']} ~{n['modified']})" if n else rel
     with open(a.out,'w',encoding='utf-8') as f:
         f.write("# Diff Summary\n\n")
         f.write("## Added\n" + ("\n".join(f"- {x}" for x in added) if added else "- (none)") + "\n\n")
         f.write("## Removed\n" + ("\n".join(f"- {x}" for x in removed) if removed else "- (none)") + "\n\n")
-        f.write("## Changed\n" + ("\n".join(f"- {x}" for x in changed) if changed else "- (none)") + "\n")
-    print(f"wrote {a.out}")
+        f.write("## Changed\n" + ("\n".join(f"- {label(x)}" for x in changed) if changed else "- (none)") + "\n")
+    print(f"wrote {a.out} ({len(common)} common files: {len(common)-len(tohash)} decided by size/mtime, {len(tohash)} compared by hash)")
 
 if __name__=="__main__":
     main()
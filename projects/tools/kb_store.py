@@ -0,0 +1,559 @@
+"""
+Knowledge-base storage behind one small access interface.
+
+Two backends share the same API (scan / append / fingerprint / end):
+
+- CsvKB: the original ``knowledge_base.csv`` (still the import/export format).
+- ColumnarKB: a ``knowledge_base.kb/`` directory holding one file per column.
+  Low-cardinality columns (company, region, date, ...) are stored as uint32
+  codes into an append-only string dictionary; free-text and near-unique
+  columns (headline, product, customer, ...) as uint64 end offsets into a
+  UTF-8 blob.
+  Column files are memory-mapped on read, so a scan only touches the columns
+  it projects. Per-block min/max date ordinals let date-range scans skip whole
+  blocks, and equality filters on dictionary columns are resolved against the
+  dictionary once instead of per row.
+
+Usage:
+    python tools/kb_store.py import 02_structured/knowledge_base.csv 02_structured/knowledge_base.kb
+    python tools/kb_store.py export 02_structured/knowledge_base.kb 02_structured/knowledge_base.csv
+    python tools/kb_store.py info 02_structured/knowledge_base.kb
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import mmap
+import os
+import sys
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+# Directory suffix of a columnar knowledge base
+COLUMNAR_SUFFIX = '.kb'
+
+# Column holding the row date (ISO YYYY-MM-DD), used for range pushdown
+DATE_COLUMN = 'date'
+
+# High-cardinality columns stored as raw text instead of dictionary codes
+# (product and customer are close to unique per row, so a dictionary would
+# grow with the store and only add a lookup per row)
+TEXT_COLUMNS = {
+    'threat_opportunity', 'headline', 'evidence_quote', 'url', 'source',
+    'product', 'customer',
+}
+
+# Rows per zone-map block (min/max date ordinal per block)
+BLOCK_ROWS = 65536
+
+MANIFEST = 'manifest.json'
+FORMAT_VERSION = 1
+
+PathLike = Union[str, Path]
+Where = Dict[str, Union[str, Iterable[str]]]
+
+
+def date_ordinal(value: str) -> Optional[int]:
+    """Return the proleptic ordinal of an ISO date string, or None if unparsable."""
+    try:
+        return datetime.date.fromisoformat(value.strip()[:10]).toordinal()
+    except (ValueError, AttributeError):
+        return None
+
+
+def _date_bounds(date_from: Optional[str], date_to: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    lo = date_ordinal(date_from) if date_from else None
+    hi = date_ordinal(date_to) if date_to else None
+    if date_from and lo is None or date_to and hi is None:
+        raise ValueError(f"Invalid date bound: {date_from!r}..{date_to!r} (expected YYYY-MM-DD)")
+    return lo, hi
+
+
+def _in_range(ordinal: Optional[int], lo: Optional[int], hi: Optional[int]) -> bool:
+    if lo is None and hi is None:
+        return True
+    if ordinal is None:
+        return False
+    return (lo is None or ordinal >= lo) and (hi is None or ordinal <= hi)
+
+
+def _where_sets(where: Optional[Where]) -> Dict[str, Set[str]]:
+    out = {}
+    for col, want in (where or {}).items():
+        out[col] = {want} if isinstance(want, str) else set(want)
+    return out
+
+
+def resolve_kb_path(csv_path: PathLike) -> Path:
+    """
+    Return the knowledge base to use for a configured CSV path.
+
+    The columnar store (same stem, ``.kb`` suffix) takes precedence when it
+    exists; otherwise the CSV itself is used.
+    """
+    csv_path = Path(csv_path)
+    columnar = csv_path.with_suffix(COLUMNAR_SUFFIX)
+    return columnar if columnar.is_dir() else csv_path
+
+
+def open_kb(path: PathLike) -> Union['CsvKB', 'ColumnarKB']:
+    """Open a knowledge base, picking the backend from the path."""
+    path = Path(path)
+    if path.suffix == COLUMNAR_SUFFIX or path.is_dir():
+        return ColumnarKB(path)
+    return CsvKB(path)
+
+
+class CsvKB:
+    """Knowledge base stored as a single CSV file with a header row."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def create(self, fieldnames: Sequence[str]) -> None:
+        """Create the file with a header row if it does not exist yet."""
+        if self.path.exists():
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, 'w', encoding='utf-8', newline='') as f:
+            csv.DictWriter(f, fieldnames=list(fieldnames)).writeheader()
+
+    def _header(self) -> Tuple[List[str], int]:
+        with open(self.path, 'rb') as f:
+            line = f.readline()
+        names = next(csv.reader([line.decode('utf-8-sig')]), [])
+        return names, len(line)
+
+    @property
+    def fieldnames(self) -> List[str]:
+        return self._header()[0] if self.path.exists() else []
+
+    def fingerprint(self) -> Optional[Tuple[int, int]]:
+        """(size, mtime_ns) of the CSV, or None if it does not exist."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns
+
+    def end(self) -> int:
+        """Position just past the last row (the file size); see scan(start=...)."""
+        return self.path.stat().st_size if self.path.exists() else 0
+
+    def scan(self, columns: Optional[Sequence[str]] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, where: Optional[Where] = None,
+             start: int = 0) -> Iterator[Dict[str, str]]:
+        """
+        Yield rows as dicts, optionally projected and filtered.
+
+        Args:
+            columns: Columns to return (default: all)
+            date_from: Inclusive lower bound on the date column (YYYY-MM-DD)
+            date_to: Inclusive upper bound on the date column (YYYY-MM-DD)
+            where: Column -> value (or set of values) equality filters
+            start: Byte offset of a row boundary to resume from, as returned
+                by end(); 0 means the first data row
+        """
+        if not self.path.exists():
+            return
+        lo, hi = _date_bounds(date_from, date_to)
+        wants = _where_sets(where)
+        names, header_len = self._header()
+        with open(self.path, 'rb') as raw:
+            raw.seek(max(start, header_len))
+            text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+            for row in csv.DictReader(text, fieldnames=names):
+                if lo is not None or hi is not None:
+                    if not _in_range(date_ordinal(row.get(DATE_COLUMN) or ''), lo, hi):
+                        continue
+                if any((row.get(c) or '') not in vals for c, vals in wants.items()):
+                    continue
+                yield {c: row.get(c) or '' for c in columns} if columns else row
+
+    def append(self, rows: Iterable[Dict[str, str]]) -> int:
+        """Append rows (creating the header from the first row if needed); returns count."""
+        rows = list(rows)
+        if not rows:
+            return 0
+        if not self.path.exists():
+            self.create(list(rows[0].keys()))
+        with open(self.path, 'a', encoding='utf-8', newline='') as f:
+            csv.DictWriter(f, fieldnames=self.fieldnames).writerows(rows)
+        return len(rows)
+
+
+class ColumnarKB:
+    """Knowledge base stored column-by-column in a directory; see module docstring."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._manifest = None
+        # dictionary column -> (dict bytes loaded, value -> code), kept across appends
+        self._lookups = {}
+
+    # -- metadata -------------------------------------------------------
+
+    def exists(self) -> bool:
+        return (self.path / MANIFEST).exists()
+
+    @property
+    def manifest(self) -> Dict:
+        if self._manifest is None:
+            with open(self.path / MANIFEST, 'r', encoding='utf-8') as f:
+                self._manifest = json.load(f)
+            if self._manifest.get('version') != FORMAT_VERSION:
+                raise ValueError(f"{self.path}: unsupported format version {self._manifest.get('version')}")
+            if self._manifest.get('byteorder') != sys.byteorder:
+                raise ValueError(f"{self.path}: written on a {self._manifest.get('byteorder')}-endian host")
+        return self._manifest
+
+    @property
+    def fieldnames(self) -> List[str]:
+        return [c['name'] for c in self.manifest['columns']] if self.exists() else []
+
+    def __len__(self) -> int:
+        return self.manifest['rows'] if self.exists() else 0
+
+    def fingerprint(self) -> Optional[Tuple[int, int]]:
+        """(row count, manifest mtime_ns), or None if the store does not exist."""
+        try:
+            st = (self.path / MANIFEST).stat()
+        except FileNotFoundError:
+            return None
+        return len(self), st.st_mtime_ns
+
+    def end(self) -> int:
+        """Row index just past the last row; see scan(start=...)."""
+        return len(self)
+
+    def create(self, fieldnames: Sequence[str]) -> None:
+        """Create an empty store with the given columns if it does not exist yet."""
+        if self.exists():
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        columns = []
+        for name in fieldnames:
+            kind = 'text' if name in TEXT_COLUMNS else 'dict'
+            columns.append({'name': name, 'kind': kind, 'dict_size': 0, 'dict_bytes': 0, 'data_bytes': 0})
+            for suffix in self._files(name, kind):
+                (self.path / suffix).touch()
+        self._manifest = {
+            'version': FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'rows': 0,
+            'block_rows': BLOCK_ROWS,
+            'blocks': [],
+            'columns': columns,
+        }
+        self._write_manifest()
+
+    @staticmethod
+    def _files(name: str, kind: str) -> Tuple[str, ...]:
+        if kind == 'text':
+            return (f'{name}.offsets', f'{name}.data')
+        return (f'{name}.codes', f'{name}.dict')
+
+    def _write_manifest(self) -> None:
+        tmp = self.path / (MANIFEST + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, self.path / MANIFEST)
+
+    # -- reading ----------------------------------------------------------
+
+    def _load_dict(self, col: Dict) -> List[str]:
+        values = []
+        with open(self.path / f"{col['name']}.dict", 'rb') as f:
+            data = f.read(col['dict_bytes'])
+        for line in data.splitlines():
+            values.append(json.loads(line))
+        return values
+
+    def _lookup(self, col: Dict) -> Dict[str, int]:
+        """Value -> code map of a dictionary column; only dictionary bytes not seen yet are read."""
+        loaded, lookup = self._lookups.get(col['name'], (0, {}))
+        if loaded > col['dict_bytes']:
+            loaded, lookup = 0, {}
+        if loaded < col['dict_bytes']:
+            with open(self.path / f"{col['name']}.dict", 'rb') as f:
+                f.seek(loaded)
+                data = f.read(col['dict_bytes'] - loaded)
+            for line in data.splitlines():
+                lookup[json.loads(line)] = len(lookup)
+        self._lookups[col['name']] = (col['dict_bytes'], lookup)
+        return lookup
+
+    @contextmanager
+    def _mapped(self, filename: str, typecode: Optional[str] = None):
+        with open(self.path / filename, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield memoryview(b'').cast(typecode) if typecode else memoryview(b'')
+                return
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mm)
+            typed = view.cast(typecode) if typecode else view
+            try:
+                yield typed
+            finally:
+                typed.release()
+                view.release()
+                mm.close()
+
+    def scan(self, columns: Optional[Sequence[str]] = None, date_from: Optional[str] = None,
+             date_to: Optional[str] = None, where: Optional[Where] = None,
+             start: int = 0) -> Iterator[Dict[str, str]]:
+        """
+        Yield rows as dicts, optionally projected and filtered.
+
+        Only the projected and filtered columns are mapped. Date bounds and
+        equality filters on dictionary columns are evaluated on dictionary
+        codes; blocks whose date range misses the bounds are skipped.
+
+        Args:
+            columns: Columns to return (default: all)
+            date_from: Inclusive lower bound on the date column (YYYY-MM-DD)
+            date_to: Inclusive upper bound on the date column (YYYY-MM-DD)
+            where: Column -> value (or set of values) equality filters
+            start: Row index to resume from, as returned by end()
+        """
+        if not self.exists():
+            return
+        m = self.manifest
+        nrows = m['rows']
+        by_name = {c['name']: c for c in m['columns']}
+        wanted = list(columns) if columns else list(by_name)
+        for name in wanted:
+            if name not in by_name:
+                raise KeyError(f"{self.path}: no column {name!r}")
+        lo, hi = _date_bounds(date_from, date_to)
+
+        # Resolve filters against dictionaries: column -> allowed codes (or raw values for text)
+        code_filters = {}
+        text_filters = {}
+        for name, vals in _where_sets(where).items():
+            col = by_name[name]
+            if col['kind'] == 'dict':
+                code_filters[name] = {i for i, v in enumerate(self._load_dict(col)) if v in vals}
+            else:
+                text_filters[name] = vals
+        ranged = lo is not None or hi is not None
+        if ranged:
+            if DATE_COLUMN not in by_name:
+                raise KeyError(f"{self.path}: no column {DATE_COLUMN!r} for date bounds")
+            dates = self._load_dict(by_name[DATE_COLUMN])
+            allowed = {i for i, v in enumerate(dates) if _in_range(date_ordinal(v), lo, hi)}
+            code_filters[DATE_COLUMN] = code_filters.get(DATE_COLUMN, allowed) & allowed
+        if any(not codes for codes in code_filters.values()):
+            return
+
+        needed = set(wanted) | set(code_filters) | set(text_filters)
+        dicts = {n: self._load_dict(by_name[n]) for n in needed if by_name[n]['kind'] == 'dict'}
+
+        with self._open_columns([by_name[n] for n in needed]) as views:
+            block_rows = m['block_rows']
+            for b in range(start // block_rows, (nrows + block_rows - 1) // block_rows):
+                if ranged and not self._block_overlaps(m['blocks'][b], lo, hi):
+                    continue
+                for i in range(max(start, b * block_rows), min(nrows, (b + 1) * block_rows)):
+                    if any(views[n][0][i] not in codes for n, codes in code_filters.items()):
+                        continue
+                    if any(self._text(views, i, n) not in vals for n, vals in text_filters.items()):
+                        continue
+                    yield {n: self._value(views, dicts, by_name[n], i) for n in wanted}
+
+    @contextmanager
+    def _open_columns(self, cols: List[Dict]):
+        opened = {}
+        stack = []
+        try:
+            for col in cols:
+                if col['kind'] == 'dict':
+                    cm = self._mapped(f"{col['name']}.codes", 'I')
+                    stack.append(cm)
+                    opened[col['name']] = (cm.__enter__(), None)
+                else:
+                    cm_off = self._mapped(f"{col['name']}.offsets", 'Q')
+                    cm_data = self._mapped(f"{col['name']}.data")
+                    stack += [cm_off, cm_data]
+                    opened[col['name']] = (cm_off.__enter__(), cm_data.__enter__())
+            yield opened
+        finally:
+            for cm in reversed(stack):
+                cm.__exit__(None, None, None)
+
+    @staticmethod
+    def _block_overlaps(block: List[Optional[int]], lo: Optional[int], hi: Optional[int]) -> bool:
+        bmin, bmax = block
+        if bmin is None:
+            return False
+        return (hi is None or bmin <= hi) and (lo is None or bmax >= lo)
+
+    @staticmethod
+    def _text(views: Dict, i: int, name: str) -> str:
+        offsets, data = views[name]
+        begin = offsets[i - 1] if i else 0
+        return bytes(data[begin:offsets[i]]).decode('utf-8')
+
+    def _value(self, views: Dict, dicts: Dict, col: Dict, i: int) -> str:
+        if col['kind'] == 'dict':
+            return dicts[col['name']][views[col['name']][0][i]]
+        return self._text(views, i, col['name'])
+
+    # -- writing ----------------------------------------------------------
+
+    def _truncate_to_manifest(self) -> None:
+        """Drop bytes left behind by an append that died before its manifest update."""
+        nrows = self.manifest['rows']
+        for col in self.manifest['columns']:
+            name = col['name']
+            if col['kind'] == 'dict':
+                sizes = {f'{name}.codes': nrows * 4, f'{name}.dict': col['dict_bytes']}
+            else:
+                sizes = {f'{name}.offsets': nrows * 8, f'{name}.data': col['data_bytes']}
+            for filename, size in sizes.items():
+                p = self.path / filename
+                if p.stat().st_size != size:
+                    os.truncate(p, size)
+
+    def append(self, rows: Iterable[Dict[str, str]]) -> int:
+        """
+        Append rows and publish them with an atomic manifest update.
+
+        Missing columns are stored as empty strings; unknown columns raise
+        ValueError. Returns the number of rows appended.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        if not self.exists():
+            self.create(list(rows[0].keys()))
+        m = self.manifest
+        names = {c['name'] for c in m['columns']}
+        for row in rows:
+            extra = set(row) - names
+            if extra:
+                raise ValueError(f"{self.path}: unknown column(s) {sorted(extra)}")
+        self._truncate_to_manifest()
+        try:
+            self._append_columns(rows)
+        except BaseException:
+            # column sizes and codes in memory may describe bytes that were never published
+            self._manifest = None
+            self._lookups.clear()
+            raise
+        self._update_blocks(m['rows'], [date_ordinal(row.get(DATE_COLUMN) or '') for row in rows])
+        m['rows'] += len(rows)
+        self._write_manifest()
+        return len(rows)
+
+    def _append_columns(self, rows: List[Dict[str, str]]) -> None:
+        for col in self.manifest['columns']:
+            name = col['name']
+            values = [(row.get(name) or '') for row in rows]
+            if col['kind'] == 'dict':
+                lookup = self._lookup(col)
+                codes = array('I')
+                new_values = []
+                for v in values:
+                    code = lookup.get(v)
+                    if code is None:
+                        code = lookup[v] = len(lookup)
+                        new_values.append(v)
+                    codes.append(code)
+                encoded = b''.join(json.dumps(v, ensure_ascii=False).encode('utf-8') + b'\n' for v in new_values)
+                with open(self.path / f'{name}.dict', 'ab') as f:
+                    f.write(encoded)
+                with open(self.path / f'{name}.codes', 'ab') as f:
+                    codes.tofile(f)
+                col['dict_size'] += len(new_values)
+                col['dict_bytes'] += len(encoded)
+                self._lookups[name] = (col['dict_bytes'], lookup)
+            else:
+                offsets = array('Q')
+                chunks = []
+                end = col['data_bytes']
+                for v in values:
+                    b = v.encode('utf-8')
+                    chunks.append(b)
+                    end += len(b)
+                    offsets.append(end)
+                with open(self.path / f'{name}.data', 'ab') as f:
+                    f.write(b''.join(chunks))
+                with open(self.path / f'{name}.offsets', 'ab') as f:
+                    offsets.tofile(f)
+                col['data_bytes'] = end
+
+    def _update_blocks(self, first_row: int, ordinals: List[Optional[int]]) -> None:
+        m = self.manifest
+        block_rows = m['block_rows']
+        for offset, ordinal in enumerate(ordinals):
+            b = (first_row + offset) // block_rows
+            while len(m['blocks']) <= b:
+                m['blocks'].append([None, None])
+            if ordinal is None:
+                continue
+            block = m['blocks'][b]
+            block[0] = ordinal if block[0] is None else min(block[0], ordinal)
+            block[1] = ordinal if block[1] is None else max(block[1], ordinal)
+
+
+def import_csv(csv_path: PathLike, kb_path: PathLike, batch_size: int = 50000) -> int:
+    """Load a CSV knowledge base into a columnar store (created if missing); returns rows added."""
+    src = CsvKB(csv_path)
+    dst = ColumnarKB(kb_path)
+    dst.create(src.fieldnames)
+    total = 0
+    batch = []
+    for row in src.scan():
+        batch.append(row)
+        if len(batch) >= batch_size:
+            total += dst.append(batch)
+            batch = []
+    return total + dst.append(batch)
+
+
+def export_csv(kb_path: PathLike, csv_path: PathLike) -> int:
+    """Write any knowledge base out as a CSV with a header row; returns rows written."""
+    src = open_kb(kb_path)
+    total = 0
+    with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=src.fieldnames)
+        writer.writeheader()
+        for row in src.scan():
+            writer.writerow(row)
+            total += 1
+    return total
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Knowledge-base storage utilities")
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('import', help="CSV -> columnar store")
+    p.add_argument('csv')
+    p.add_argument('kb')
+    p = sub.add_parser('export', help="knowledge base -> CSV")
+    p.add_argument('kb')
+    p.add_argument('csv')
+    p = sub.add_parser('info', help="print backend, columns and row count")
+    p.add_argument('kb')
+    args = ap.parse_args()
+    if args.cmd == 'import':
+        print(f"kb_store: imported {import_csv(args.csv, args.kb)} rows into {args.kb}")
+    elif args.cmd == 'export':
+        print(f"kb_store: exported {export_csv(args.kb, args.csv)} rows to {args.csv}")
+    else:
+        kb = open_kb(args.kb)
+        rows = len(kb) if isinstance(kb, ColumnarKB) else sum(1 for _ in kb.scan(columns=kb.fieldnames[:1]))
+        print(f"{type(kb).__name__} {kb.path}: {rows} rows")
+        print("columns: " + ", ".join(kb.fieldnames))
+
+
+if __name__ == '__main__':
+    main()
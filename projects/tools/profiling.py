@@ -0,0 +1,84 @@
+"""
+Opt-in profiling for agent entry points.
+
+Every agent (and ingest_scanner_bullets.py) starts through run_main(), which
+profiles main() when either
+
+    --profile is on the command line (removed before main() parses argv), or
+    CGCE_PROFILE is set: "1"/"all" for every task, or a comma list of tasks.
+
+Results go to AUDIT/profiles/<task>/<UTC timestamp>_<pid>.prof (pstats, for
+snakeviz / python -m pstats) plus a .txt with the top CGCE_PROFILE_TOP
+(default 30) functions by cumulative time. With CGCE_PROFILER=pyinstrument
+and pyinstrument installed, the sampling profiler is used instead and writes
+.txt and .html. The task name defaults to the agent's own name; the job
+orchestrator (--profile task,...) sets CGCE_PROFILE_TASK so profiles are
+filed under the JOBS task name. Worker processes started by an agent are not
+profiled.
+"""
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import sys
+
+PROFILE_ROOT = os.path.join("AUDIT", "profiles")
+DEFAULT_TOP = 30
+
+
+def enabled(task):
+    """True if CGCE_PROFILE selects task."""
+    sel = os.environ.get("CGCE_PROFILE", "").strip()
+    if sel.lower() in ("1", "true", "yes", "all"):
+        return True
+    return task in {t.strip() for t in sel.split(",") if t.strip()}
+
+
+def profile_call(fn, task, root=PROFILE_ROOT, top=None):
+    """Call fn() under a profiler and write its report under root/<task>/; returns fn's result.
+
+    Reports are written even if fn raises or exits.
+    """
+    top = top or int(os.environ.get("CGCE_PROFILE_TOP", DEFAULT_TOP))
+    outdir = os.path.join(root, task)
+    os.makedirs(outdir, exist_ok=True)
+    stem = os.path.join(outdir, f"{datetime.datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}_{os.getpid()}")
+    if os.environ.get("CGCE_PROFILER", "").lower() == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("profiling: pyinstrument not installed, using cProfile", file=sys.stderr)
+        else:
+            prof = Profiler()
+            prof.start()
+            try:
+                return fn()
+            finally:
+                prof.stop()
+                with open(stem + ".txt", "w", encoding="utf-8") as f:
+                    f.write(prof.output_text())
+                with open(stem + ".html", "w", encoding="utf-8") as f:
+                    f.write(prof.output_html())
+                print(f"profiling: {task} -> {stem}.txt", file=sys.stderr)
+    prof = cProfile.Profile()
+    try:
+        return prof.runcall(fn)
+    finally:
+        prof.dump_stats(stem + ".prof")
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(top)
+        with open(stem + ".txt", "w", encoding="utf-8") as f:
+            f.write(buf.getvalue())
+        print(f"profiling: {task} -> {stem}.prof", file=sys.stderr)
+
+
+def run_main(main, task):
+    """Entry point wrapper: run main(), profiled if --profile or CGCE_PROFILE asks for it."""
+    task = os.environ.get("CGCE_PROFILE_TASK") or task
+    on = "--profile" in sys.argv[1:]
+    if on:
+        sys.argv = [a for a in sys.argv if a != "--profile"]
+    if not (on or enabled(task)):
+        return main()
+    return profile_call(main, task)